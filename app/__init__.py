@@ -1,12 +1,28 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+from flask_caching import Cache
+from sqlalchemy import JSON, event, func, inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+from contextlib import contextmanager
+import json
+import orjson
 import os
 
-db = SQLAlchemy()
+try:
+    import fcntl
+except ImportError:  # Windows: no file locks, fine for a single dev server
+    fcntl = None
+
+from app.json_provider import OrjsonProvider
+
+# Keep attributes loaded after commit so serializing a just-saved row doesn't re-SELECT it
+db = SQLAlchemy(session_options={'expire_on_commit': False})
+cache = Cache()
 
 def create_app():
     app = Flask(__name__, static_folder='../static', static_url_path='/static')
+    app.json = OrjsonProvider(app)
 
     # Get absolute path for database
     basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
@@ -19,9 +35,24 @@ def create_app():
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f'sqlite:///{db_path}')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Larger compiled-statement cache (default 500) for the per-filter query variants
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'query_cache_size': 1200,
+        # JSON columns (Lead.keywords) are encoded/decoded for every row read or written
+        'json_serializer': _json_dumps,
+        'json_deserializer': orjson.loads
+    }
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'].update(pool_size=20, pool_pre_ping=True)
+
+    # Response cache; the file system backend is shared by all worker processes
+    app.config['CACHE_TYPE'] = os.environ.get('CACHE_TYPE', 'FileSystemCache')
+    app.config['CACHE_DIR'] = os.path.join(basedir, 'instance', 'cache')
+    app.config['CACHE_DEFAULT_TIMEOUT'] = 30
 
     # Initialize extensions
     db.init_app(app)
+    cache.init_app(app)
     CORS(app)
 
     # Register blueprints
@@ -29,8 +60,123 @@ def create_app():
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
 
-    # Create database tables
+    # Create database tables. Every gunicorn worker runs this on boot, so the
+    # steps are serialized and each one re-checks what is already done.
     with app.app_context():
-        db.create_all()
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _sqlite_pragma)
+        with _schema_lock(os.path.join(basedir, 'instance', 'schema.lock')):
+            _migrate_schema()
 
     return app
+
+
+def _migrate_schema():
+    """Create tables and bring an existing database up to date (idempotent)."""
+    db.create_all()
+    _add_missing_columns()
+    _migrate_keywords_to_json()
+    _backfill_lead_keywords()
+    _create_missing_indexes()
+
+
+# Arbitrary but fixed key for the PostgreSQL advisory lock around _migrate_schema()
+_SCHEMA_LOCK_KEY = 0x46756E6E
+
+
+@contextmanager
+def _schema_lock(lock_path):
+    """Hold an exclusive lock (all worker processes) while the schema is migrated."""
+    if db.engine.dialect.name == 'postgresql':
+        # Session-level advisory lock; also covers workers on other hosts
+        with db.engine.connect() as conn:
+            conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': _SCHEMA_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': _SCHEMA_LOCK_KEY})
+        return
+
+    with open(lock_path, 'w') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when the file is closed
+        yield
+
+
+def _json_dumps(obj):
+    return orjson.dumps(obj).decode()
+
+
+def _sqlite_pragma(dbapi_conn, _connection_record):
+    """Use WAL so readers don't block on writers, plus a larger page cache."""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+
+def _add_missing_columns():
+    """Add columns introduced after a table was first created (create_all skips existing tables)."""
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=conn.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+
+def _migrate_keywords_to_json():
+    """Convert comma-separated keywords stored before the JSON column into JSON arrays."""
+    with db.engine.begin() as conn:
+        if conn.dialect.name == 'postgresql':
+            columns = {column['name']: column['type'] for column in inspect(conn).get_columns('leads')}
+            if not isinstance(columns['keywords'], JSON):
+                conn.execute(text(
+                    "ALTER TABLE leads ALTER COLUMN keywords TYPE JSONB "
+                    "USING to_jsonb(string_to_array(keywords, ','))"
+                ))
+            return
+
+        # SQLite keeps the declared type; only the stored text needs converting
+        rows = conn.execute(text(
+            "SELECT id, keywords FROM leads "
+            "WHERE keywords IS NOT NULL AND keywords NOT LIKE '[%' AND keywords != 'null'"
+        )).all()
+        if rows:
+            conn.execute(
+                text("UPDATE leads SET keywords = :keywords WHERE id = :id"),
+                [{'id': row.id, 'keywords': json.dumps([k.strip() for k in row.keywords.split(',') if k.strip()])}
+                 for row in rows]
+            )
+
+
+def _backfill_lead_keywords():
+    """Fill the keyword lookup table for leads stored before it existed (or before keywords were lowercased)."""
+    from app.models import Lead, LeadKeyword, sync_lead_keywords
+
+    has_rows = db.session.query(LeadKeyword.lead_id).first() is not None
+    unnormalized = db.session.query(LeadKeyword.lead_id).filter(
+        LeadKeyword.keyword != func.lower(func.trim(LeadKeyword.keyword))
+    ).first() is not None
+    if has_rows and not unnormalized:
+        return
+
+    leads = db.session.query(Lead.id, Lead.keywords).filter(Lead.keywords.isnot(None)).all()
+    sync_lead_keywords(db.session.connection(), leads)
+    db.session.commit()
+
+
+def _create_missing_indexes():
+    """Add indexes introduced after a table was first created (create_all skips existing tables)."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=db.engine, checkfirst=True)
+            except SQLAlchemyError as e:
+                # e.g. a unique index over data that still contains duplicates
+                print(f"Could not create index {index.name}: {e}")
@@ -1,6 +1,11 @@
-from app import db
+from app import db, cache
+from sqlalchemy import delete, event, insert, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 from enum import Enum
+from itertools import chain
+import uuid
 
 class LeadStatus(str, Enum):
     NEU = 'neu'
@@ -10,6 +15,25 @@ class LeadStatus(str, Enum):
     ANGESCHRIEBEN = 'angeschrieben'
     ANTWORT_ERHALTEN = 'antwort_erhalten'
 
+
+# The enum is fixed at import time, so its values are computed once
+STATUS_OPTIONS = tuple(status.value for status in LeadStatus)
+STATUS_OPTIONS_SET = frozenset(STATUS_OPTIONS)
+
+# Statuses from which a cover letter can be generated (research is done)
+LETTER_STATUSES = frozenset((
+    LeadStatus.RECHERCHIERT.value, LeadStatus.ANSCHREIBEN_ERSTELLT.value,
+    LeadStatus.ANGESCHRIEBEN.value, LeadStatus.ANTWORT_ERHALTEN.value
+))
+
+
+class JobStatus(str, Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+
+
 class Lead(db.Model):
     __tablename__ = 'leads'
 
@@ -19,7 +43,8 @@ class Lead(db.Model):
     titel = db.Column(db.String(500), nullable=False)
     quelle = db.Column(db.String(200), default='StepStone')
     quelle_url = db.Column(db.String(1000))
-    keywords = db.Column(db.String(500))  # Comma-separated
+    standort = db.Column(db.String(200))
+    keywords = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'))  # List of strings
     textvorschau = db.Column(db.Text)  # Full job description text
     volltext = db.Column(db.Text)
 
@@ -43,29 +68,123 @@ class Lead(db.Model):
     erstellt_am = db.Column(db.DateTime, default=datetime.utcnow)
     aktualisiert_am = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Columns selected for the lead list; details are loaded per lead
+    LIST_COLUMNS = ('id', 'titel', 'firmenname', 'status', 'keywords', 'erstellt_am')
+
+    @staticmethod
+    def normalize_keywords(keywords):
+        """Accept a list or a comma-separated string and return a clean list of strings."""
+        if not keywords:
+            return []
+        if isinstance(keywords, str):
+            keywords = keywords.split(',')
+        elif not isinstance(keywords, (list, tuple)):
+            keywords = [keywords]
+        stripped = (str(keyword).strip() for keyword in keywords if keyword is not None)
+        return [keyword for keyword in stripped if keyword]
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'titel': self.titel,
-            'quelle': self.quelle,
-            'quelle_url': self.quelle_url,
-            'keywords': self.keywords.split(',') if self.keywords else [],
-            'textvorschau': self.textvorschau,
-            'volltext': self.volltext,
-            'firmenname': self.firmenname,
-            'firmen_website': self.firmen_website,
-            'firmen_adresse': self.firmen_adresse,
-            'firmen_email': self.firmen_email,
-            'ansprechpartner_name': self.ansprechpartner_name,
-            'ansprechpartner_rolle': self.ansprechpartner_rolle,
-            'ansprechpartner_linkedin': self.ansprechpartner_linkedin,
-            'ansprechpartner_quelle': self.ansprechpartner_quelle,
-            'anschreiben': self.anschreiben,
-            'status': self.status,
-            'erstellt_am': self.erstellt_am.isoformat() if self.erstellt_am else None,
-            'aktualisiert_am': self.aktualisiert_am.isoformat() if self.aktualisiert_am else None
-        }
+        data = {column: getattr(self, column) for column in self.DICT_COLUMNS}
+        data['keywords'] = self.keywords or []
+        return data
 
     @staticmethod
     def get_status_options():
-        return [status.value for status in LeadStatus]
+        return STATUS_OPTIONS
+
+
+class LeadKeyword(db.Model):
+    """Keyword lookup table: one row per (keyword, lead), kept in sync with Lead.keywords."""
+    __tablename__ = 'lead_keywords'
+
+    # Stored as keyword_key(), so the filter is case-insensitive; the lead_id index serves the re-syncs
+    keyword = db.Column(db.String(200), primary_key=True)
+    lead_id = db.Column(db.Integer, db.ForeignKey('leads.id', ondelete='CASCADE'), primary_key=True, index=True)
+
+
+def keyword_key(keyword):
+    """Normalized form of a keyword as stored in (and searched against) the lookup table."""
+    return str(keyword).strip().lower()
+
+
+def sync_lead_keywords(connection, leads):
+    """Replace the LeadKeyword rows for (lead_id, keywords) pairs."""
+    leads = list(leads)
+    if not leads:
+        return
+
+    connection.execute(delete(LeadKeyword).where(LeadKeyword.lead_id.in_([lead_id for lead_id, _ in leads])))
+    rows = [
+        {'lead_id': lead_id, 'keyword': keyword}
+        for lead_id, keywords in leads
+        for keyword in dict.fromkeys(filter(None, map(keyword_key, keywords or [])))
+    ]
+    if rows:
+        connection.execute(insert(LeadKeyword), rows)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_lead_changes(session, flush_context):
+    # new/dirty/deleted and attribute history still show the pre-flush state here
+    changed = [
+        obj for obj in chain(session.new, session.dirty)
+        if isinstance(obj, Lead) and (obj in session.new or inspect(obj).attrs.keywords.history.has_changes())
+    ]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Lead)]
+
+    if changed:
+        sync_lead_keywords(session.connection(), ((lead.id, lead.keywords) for lead in changed))
+    if deleted:
+        # SQLite does not enforce the ON DELETE CASCADE without PRAGMA foreign_keys
+        session.connection().execute(delete(LeadKeyword).where(LeadKeyword.lead_id.in_(deleted)))
+
+    if any(isinstance(obj, Lead) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info['leads_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_lead_cache(session):
+    # Cleared after the commit so no request can re-cache the old rows in between
+    if session.info.pop('leads_changed', False):
+        cache.clear()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_lead_changes(session):
+    session.info.pop('leads_changed', None)
+
+
+# Columns serialized by to_dict(), derived from the table so new columns are included automatically.
+# Datetimes are encoded by the JSON provider.
+Lead.DICT_COLUMNS = tuple(column.name for column in Lead.__table__.columns)
+
+# Serves the status filter + newest-first ordering of the lead list
+db.Index('ix_leads_status_erstellt', Lead.status, Lead.erstellt_am.desc())
+
+# Newest-first ordering and cursor seeks of the unfiltered lead list
+db.Index('ix_leads_erstellt_id', Lead.erstellt_am.desc(), Lead.id.desc())
+
+# One lead per job posting; also backs the URL lookups of the StepStone import
+db.Index('ux_leads_quelle_url', Lead.quelle_url, unique=True)
+
+
+class ResearchJob(db.Model):
+    """A background research run, stored in the DB so every worker process can report on it."""
+    __tablename__ = 'research_jobs'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    lead_id = db.Column(db.Integer, nullable=False, index=True)
+    status = db.Column(db.String(20), default=JobStatus.QUEUED.value)
+    error = db.Column(db.Text)
+    erstellt_am = db.Column(db.DateTime, default=datetime.utcnow)
+    aktualisiert_am = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'lead_id': self.lead_id,
+            'status': self.status,
+            'error': self.error,
+            'erstellt_am': self.erstellt_am,
+            'aktualisiert_am': self.aktualisiert_am
+        }
@@ -3,9 +3,239 @@ Perplexity AI Service for company research.
 Uses the Perplexity API to search for real company information.
 """
 import os
-import re
 import json
+import random
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachelib import FileSystemCache
+from app.ratelimit import RateLimiter
+
+PERPLEXITY_API_URL = "https://api.perplexity.ai/chat/completions"
+PERPLEXITY_MODEL = "llama-3.1-sonar-small-128k-online"
+
+# Identical for every call; only the user message differs per request
+_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "Du bist ein Recherche-Assistent für B2B-Vertrieb. Deine Aufgabe ist es, Firmendaten zu recherchieren und strukturiert zurückzugeben. Antworte immer auf Deutsch und liefere nur verifizierte Informationen. Wenn du etwas nicht findest, schreibe 'NICHT_GEFUNDEN'."
+}
+
+# Prompt scaffolding, filled in with str.format() per call
+_RESEARCH_PROMPT = """Recherchiere folgende Firmendaten für: {context}
+
+Finde bitte:
+1. Die offizielle Website der Firma
+2. Die Firmenadresse (aus dem Impressum)
+3. Eine Kontakt-E-Mail-Adresse (aus dem Impressum, bevorzugt info@ oder kontakt@)
+4. Den Namen eines Entscheiders (CEO, CTO, Geschäftsführer, Head of HR, oder Head of Learning & Development)
+5. Die Rolle/Position dieser Person
+6. Den LinkedIn-Profil-Link dieser Person (falls vorhanden)
+
+Antworte NUR im folgenden JSON-Format, ohne zusätzlichen Text:
+{{
+    "firmen_website": "https://...",
+    "firmen_adresse": "Straße Nr, PLZ Stadt",
+    "firmen_email": "email@firma.de",
+    "ansprechpartner_name": "Vorname Nachname",
+    "ansprechpartner_rolle": "Position",
+    "ansprechpartner_linkedin": "https://linkedin.com/in/..."
+}}
+
+Falls du eine Information nicht findest, setze den Wert auf null.
+"""
+
+_BATCH_RESEARCH_PROMPT = """Recherchiere die Firmendaten für jede der folgenden {count} Firmen:
+
+{company_list}
+
+Finde für jede Firma:
+1. Die offizielle Website der Firma
+2. Die Firmenadresse (aus dem Impressum)
+3. Eine Kontakt-E-Mail-Adresse (aus dem Impressum, bevorzugt info@ oder kontakt@)
+4. Den Namen eines Entscheiders (CEO, CTO, Geschäftsführer, Head of HR, oder Head of Learning & Development)
+5. Die Rolle/Position dieser Person
+6. Den LinkedIn-Profil-Link dieser Person (falls vorhanden)
+
+Antworte NUR mit einem JSON-Array mit genau {count} Objekten in derselben Reihenfolge wie die Liste, ohne zusätzlichen Text:
+[
+    {{
+        "firmen_website": "https://...",
+        "firmen_adresse": "Straße Nr, PLZ Stadt",
+        "firmen_email": "email@firma.de",
+        "ansprechpartner_name": "Vorname Nachname",
+        "ansprechpartner_rolle": "Position",
+        "ansprechpartner_linkedin": "https://linkedin.com/in/..."
+    }}
+]
+
+Falls du eine Information nicht findest, setze den Wert auf null.
+"""
+
+_DECISION_MAKER_PROMPT = """Finde einen Entscheider bei der Firma "{company_name}" im Bereich {department}.
+
+Suche nach Personen mit Titeln wie:
+- CEO, CTO, CIO, CDO (Chief Digital Officer)
+- Head of {department}
+- VP {department}
+- Director {department}
+- Leiter {department}
+
+Antworte NUR im folgenden JSON-Format:
+{{
+    "name": "Vorname Nachname",
+    "rolle": "Position/Titel",
+    "linkedin": "https://linkedin.com/in/...",
+    "quelle": "Woher die Information stammt"
+}}
+
+Falls du niemanden findest, setze alle Werte auf null.
+"""
+
+# Upper bound for parallel Perplexity calls in research_many()
+MAX_CONCURRENT_REQUESTS = 5
+
+# Companies packed into a single prompt by research_companies()
+RESEARCH_BATCH_SIZE = 10
+
+# Retries after a 429 "Too Many Requests" answer before giving up
+MAX_RATE_LIMIT_RETRIES = 3
+
+# Longest wait between those retries, whatever Retry-After asks for
+MAX_RETRY_DELAY = 30
+
+# Researched company data rarely changes, so results are kept for a week.
+# Stored on the file system so every gunicorn worker sees the same entries (and
+# invalidate() reaches all of them); a directory of its own keeps the results out
+# of the response cache, which is cleared on every lead change.
+RESEARCH_CACHE_TTL = 7 * 24 * 3600
+_research_cache = FileSystemCache(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'research_cache'),
+    threshold=1024,
+    default_timeout=RESEARCH_CACHE_TTL
+)
+
+# Answers without any data are cached too, but only briefly, so unresolvable
+# companies don't trigger a paid call on every retry
+NEGATIVE_CACHE_TTL = 3600
+
+# Shared session so TLS connections to the API are reused (keep-alive).
+# Transient gateway errors are retried here; 429s are handled by _call_api.
+# Completions are paid and not idempotent, so a read timeout (the request may
+# already be processed) is never re-sent; only 502/503/504 answers are retried.
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=['POST'],
+        raise_on_status=False
+    )
+))
+
+
+# Shared by all PerplexityService instances (and threads) in this process
+_rate_limiter = RateLimiter(
+    rpm=int(os.environ.get('PERPLEXITY_RPM', 50)),
+    tpm=int(os.environ.get('PERPLEXITY_TPM', 0))
+)
+
+
+def _retry_delay(response, attempt: int) -> float:
+    """
+    Seconds to wait after a 429: honour Retry-After, else back off exponentially, plus jitter.
+
+    Capped at MAX_RETRY_DELAY so a huge Retry-After can't park a thread; once
+    MAX_RATE_LIMIT_RETRIES are used up, _call_api raises instead of waiting again.
+    """
+    try:
+        delay = float(response.headers.get('Retry-After', ''))
+    except ValueError:
+        delay = 2 ** attempt
+    if not delay >= 0:  # negative or NaN
+        delay = 2 ** attempt
+
+    return min(delay, MAX_RETRY_DELAY) + random.uniform(0, 1)
+
+
+def _cache_key(company_name: str, job_title: str = None, location: str = None) -> str:
+    """Normalize research inputs so trivially different spellings share a cache entry."""
+    return 'research:' + json.dumps([
+        (company_name or '').strip().lower(),
+        (location or '').strip().lower(),
+        (job_title or '').strip().lower()
+    ])
+
+
+def _cache_result(cache_key, result: dict):
+    """Cache a cleaned research result; empty answers expire after NEGATIVE_CACHE_TTL."""
+    ttl = None if any(result.values()) else NEGATIVE_CACHE_TTL
+    _research_cache.set(cache_key, dict(result), timeout=ttl)
+
+
+def _build_context(company_name: str, job_title: str = None, location: str = None) -> str:
+    """Describe a company for a research prompt."""
+    context_parts = [f"Firma: {company_name}"]
+    if location:
+        context_parts.append(f"Standort: {location}")
+    if job_title:
+        context_parts.append(f"Stellenanzeige: {job_title}")
+
+    return ", ".join(context_parts)
+
+
+# Answer values that mean "nothing found"
+_EMPTY_VALUES = frozenset({"", "NICHT_GEFUNDEN", "null", "nicht gefunden", "Nicht gefunden"})
+
+_json_decoder = json.JSONDecoder()
+
+
+def _extract_json(text: str, expected_type: type = dict):
+    """
+    Decode the first JSON object (or array) embedded in a model answer.
+
+    Unlike a regex, raw_decode() handles nested braces and ignores any text
+    before or after the JSON. Candidates that don't decode to expected_type
+    are skipped, as are arrays that don't consist of objects (e.g. "[1]"
+    citation markers). Returns None if nothing fits.
+    """
+    start_char = '[' if expected_type is list else '{'
+    index = text.find(start_char)
+
+    while index != -1:
+        try:
+            value, _ = _json_decoder.raw_decode(text, index)
+            if isinstance(value, expected_type) and \
+                    (expected_type is not list or all(isinstance(item, dict) for item in value)):
+                return value
+        except json.JSONDecodeError:
+            pass
+        index = text.find(start_char, index + 1)
+
+    return None
+
+
+def _is_empty(value) -> bool:
+    return value is None or (isinstance(value, str) and (value in _EMPTY_VALUES or "NICHT_GEFUNDEN" in value))
+
+
+def _clean_value(value):
+    """A string for the lead's String/Text columns, or None for empty or nested (object/array) values."""
+    if isinstance(value, (dict, list)):
+        return None
+    if value is not None and not isinstance(value, str):
+        value = str(value)
+    return None if _is_empty(value) else value
+
+
+def _clean_result(result: dict) -> dict:
+    """Replace "NICHT_GEFUNDEN", empty or nested values with None and coerce the rest to strings."""
+    return {key: _clean_value(value) for key, value in result.items()}
 
 
 class PerplexityService:
@@ -13,9 +243,9 @@ class PerplexityService:
 
     def __init__(self):
         self.api_key = os.environ.get('PERPLEXITY_API_KEY')
-        self.base_url = "https://api.perplexity.ai/chat/completions"
+        self.base_url = PERPLEXITY_API_URL
 
-    def _call_api(self, prompt: str) -> str:
+    def _call_api(self, prompt: str, max_tokens: int = 1000) -> str:
         """Make a call to the Perplexity API."""
         if not self.api_key:
             raise ValueError("PERPLEXITY_API_KEY not configured")
@@ -26,36 +256,46 @@ class PerplexityService:
         }
 
         payload = {
-            "model": "llama-3.1-sonar-small-128k-online",
+            "model": PERPLEXITY_MODEL,
             "messages": [
-                {
-                    "role": "system",
-                    "content": "Du bist ein Recherche-Assistent für B2B-Vertrieb. Deine Aufgabe ist es, Firmendaten zu recherchieren und strukturiert zurückzugeben. Antworte immer auf Deutsch und liefere nur verifizierte Informationen. Wenn du etwas nicht findest, schreibe 'NICHT_GEFUNDEN'."
-                },
+                _SYSTEM_MESSAGE,
                 {
                     "role": "user",
                     "content": prompt
                 }
             ],
             "temperature": 0.1,
-            "max_tokens": 1000
+            "max_tokens": max_tokens
         }
 
+        # Rough estimate: ~4 characters per prompt token plus the answer budget
+        estimated_tokens = len(prompt) // 4 + max_tokens
+
         try:
-            response = requests.post(
-                self.base_url,
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data['choices'][0]['message']['content']
+            for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+                _rate_limiter.acquire(estimated_tokens)
+
+                response = _session.post(
+                    self.base_url,
+                    headers=headers,
+                    json=payload,
+                    timeout=(5, 30)
+                )
+
+                if response.status_code == 429 and attempt < MAX_RATE_LIMIT_RETRIES:
+                    _rate_limiter.backoff()
+                    time.sleep(_retry_delay(response, attempt))
+                    continue
+
+                response.raise_for_status()
+                data = response.json()
+                return data['choices'][0]['message']['content']
         except requests.exceptions.RequestException as e:
             print(f"Perplexity API error: {e}")
             raise
 
-    def research_company(self, company_name: str, job_title: str = None, location: str = None) -> dict:
+    def research_company(self, company_name: str, job_title: str = None, location: str = None,
+                         force: bool = False) -> dict:
         """
         Research company information.
 
@@ -66,66 +306,144 @@ class PerplexityService:
         - ansprechpartner_name: Contact person name
         - ansprechpartner_rolle: Contact person role
         - ansprechpartner_linkedin: LinkedIn profile URL
-        """
-        # Build search context
-        context_parts = [f"Firma: {company_name}"]
-        if location:
-            context_parts.append(f"Standort: {location}")
-        if job_title:
-            context_parts.append(f"Stellenanzeige: {job_title}")
-
-        context = ", ".join(context_parts)
 
-        prompt = f"""Recherchiere folgende Firmendaten für: {context}
-
-Finde bitte:
-1. Die offizielle Website der Firma
-2. Die Firmenadresse (aus dem Impressum)
-3. Eine Kontakt-E-Mail-Adresse (aus dem Impressum, bevorzugt info@ oder kontakt@)
-4. Den Namen eines Entscheiders (CEO, CTO, Geschäftsführer, Head of HR, oder Head of Learning & Development)
-5. Die Rolle/Position dieser Person
-6. Den LinkedIn-Profil-Link dieser Person (falls vorhanden)
+        Results are cached per (company, location, job title), so researching
+        the same company again does not trigger another paid API call.
+        Pass force=True to skip the cache lookup (the fresh answer is cached).
+        """
+        cache_key = _cache_key(company_name, job_title, location)
+        cached = None if force else _research_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
 
-Antworte NUR im folgenden JSON-Format, ohne zusätzlichen Text:
-{{
-    "firmen_website": "https://...",
-    "firmen_adresse": "Straße Nr, PLZ Stadt",
-    "firmen_email": "email@firma.de",
-    "ansprechpartner_name": "Vorname Nachname",
-    "ansprechpartner_rolle": "Position",
-    "ansprechpartner_linkedin": "https://linkedin.com/in/..."
-}}
+        context = _build_context(company_name, job_title, location)
 
-Falls du eine Information nicht findest, setze den Wert auf null.
-"""
+        prompt = _RESEARCH_PROMPT.format(context=context)
 
         try:
             response_text = self._call_api(prompt)
 
             # Try to extract JSON from response
-            json_match = re.search(r'\{[^{}]*\}', response_text, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-
-                # Clean up results - replace "NICHT_GEFUNDEN" or empty strings with None
-                for key in result:
-                    if result[key] in [None, "", "NICHT_GEFUNDEN", "null", "nicht gefunden", "Nicht gefunden"]:
-                        result[key] = None
-                    elif result[key] and "NICHT_GEFUNDEN" in str(result[key]):
-                        result[key] = None
-
+            parsed = _extract_json(response_text)
+            if parsed is not None:
+                result = _clean_result(parsed)
+                _cache_result(cache_key, result)
                 return result
             else:
                 print(f"Could not parse JSON from response: {response_text}")
                 return {}
 
-        except json.JSONDecodeError as e:
-            print(f"JSON parse error: {e}")
-            return {}
         except Exception as e:
             print(f"Research error: {e}")
             raise
 
+    @staticmethod
+    def invalidate(company_name: str, job_title: str = None, location: str = None):
+        """Drop the cached research result for a company."""
+        _research_cache.delete(_cache_key(company_name, job_title, location))
+
+    def research_many(self, companies: list, max_workers: int = MAX_CONCURRENT_REQUESTS) -> list:
+        """
+        Research several companies concurrently.
+
+        Each entry in `companies` holds the keyword arguments for research_company().
+        The API round-trip is network-bound, so running the calls in a thread pool
+        lets N researches finish in roughly the time of one.
+
+        Returns a list in the same order as `companies`. Failed lookups yield None.
+        """
+        def research_one(company):
+            try:
+                return self.research_company(**company)
+            except Exception as e:
+                print(f"Research error for {company.get('company_name')}: {e}")
+                return None
+
+        if not companies:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(companies))) as executor:
+            return list(executor.map(research_one, companies))
+
+    def research_companies(self, companies: list) -> list:
+        """
+        Research several companies with as few API calls as possible.
+
+        Uncached companies are packed into prompts of up to RESEARCH_BATCH_SIZE
+        entries that ask for a JSON array in the same order. If an answer can't
+        be matched up with its companies, that chunk falls back to one
+        research_company() call per company.
+
+        Returns a list in the same order as `companies`. Failed lookups yield None.
+        """
+        results = [None] * len(companies)
+        pending = []
+
+        for index, company in enumerate(companies):
+            cached = _research_cache.get(_cache_key(**company))
+            if cached is not None:
+                results[index] = dict(cached)
+            else:
+                pending.append(index)
+
+        chunks = [pending[i:i + RESEARCH_BATCH_SIZE] for i in range(0, len(pending), RESEARCH_BATCH_SIZE)]
+        if not chunks:
+            return results
+
+        def research_chunk(chunk):
+            chunk_companies = [companies[index] for index in chunk]
+            chunk_results = None
+            if len(chunk) > 1:
+                chunk_results = self._research_batch(chunk_companies)
+            if chunk_results is None:
+                chunk_results = self.research_many(chunk_companies)
+            return chunk, chunk_results
+
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REQUESTS, len(chunks))) as executor:
+            for chunk, chunk_results in executor.map(research_chunk, chunks):
+                for index, result in zip(chunk, chunk_results):
+                    results[index] = result
+
+        return results
+
+    def _research_batch(self, companies: list):
+        """
+        Research up to RESEARCH_BATCH_SIZE companies with a single prompt.
+
+        Returns the list of results, or None if the answer could not be parsed
+        into exactly one object per company.
+        """
+        company_list = "\n".join(
+            f"{number}. {_build_context(**company)}"
+            for number, company in enumerate(companies, start=1)
+        )
+
+        prompt = _BATCH_RESEARCH_PROMPT.format(count=len(companies), company_list=company_list)
+
+        try:
+            response_text = self._call_api(prompt, max_tokens=300 * len(companies))
+
+            parsed = _extract_json(response_text, list)
+            if parsed is None:
+                print(f"Could not parse JSON array from response: {response_text}")
+                return None
+
+            if len(parsed) != len(companies):
+                print(f"Batch research returned {len(parsed)} results for {len(companies)} companies")
+                return None
+
+        except Exception as e:
+            print(f"Batch research error: {e}")
+            return None
+
+        results = []
+        for company, result in zip(companies, parsed):
+            result = _clean_result(result)
+            _cache_result(_cache_key(**company), result)
+            results.append(result)
+
+        return results
+
     def find_decision_maker(self, company_name: str, department: str = "IT") -> dict:
         """
         Find a specific decision maker at a company.
@@ -136,39 +454,14 @@ Falls du eine Information nicht findest, setze den Wert auf null.
 
         Returns dict with contact person details.
         """
-        prompt = f"""Finde einen Entscheider bei der Firma "{company_name}" im Bereich {department}.
-
-Suche nach Personen mit Titeln wie:
-- CEO, CTO, CIO, CDO (Chief Digital Officer)
-- Head of {department}
-- VP {department}
-- Director {department}
-- Leiter {department}
-
-Antworte NUR im folgenden JSON-Format:
-{{
-    "name": "Vorname Nachname",
-    "rolle": "Position/Titel",
-    "linkedin": "https://linkedin.com/in/...",
-    "quelle": "Woher die Information stammt"
-}}
-
-Falls du niemanden findest, setze alle Werte auf null.
-"""
+        prompt = _DECISION_MAKER_PROMPT.format(company_name=company_name, department=department)
 
         try:
             response_text = self._call_api(prompt)
 
-            json_match = re.search(r'\{[^{}]*\}', response_text, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-
-                # Clean up
-                for key in result:
-                    if result[key] in [None, "", "NICHT_GEFUNDEN", "null"]:
-                        result[key] = None
-
-                return result
+            parsed = _extract_json(response_text)
+            if parsed is not None:
+                return _clean_result(parsed)
             return {}
 
         except Exception as e:
@@ -0,0 +1,64 @@
+"""
+Request rate limiting shared by the service modules.
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests per minute and tokens per minute.
+
+    acquire() blocks just long enough to stay under both quotas instead of
+    running into the API limits and retrying blindly. After a 429 the request
+    rate is lowered by 10% for the next minute (AIMD) and restored afterwards.
+    """
+
+    def __init__(self, rpm: int, tpm: int = 0):
+        self.rpm = rpm
+        self.tpm = tpm  # 0 disables the token quota
+        self._rate_factor = 1.0
+        self._penalty_until = 0.0
+        self._requests_left = float(rpm)
+        self._tokens_left = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        if now >= self._penalty_until:
+            self._rate_factor = 1.0
+
+        elapsed = now - self._updated
+        self._updated = now
+
+        rpm = self.rpm * self._rate_factor
+        self._requests_left = min(rpm, self._requests_left + elapsed * rpm / 60)
+        if self.tpm:
+            self._tokens_left = min(self.tpm, self._tokens_left + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens: int = 0):
+        """Block until one request using `tokens` tokens fits into the quota."""
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+
+                wait = 0.0
+                if self._requests_left < 1:
+                    wait = (1 - self._requests_left) * 60 / (self.rpm * self._rate_factor)
+                if self._tokens_left < tokens:
+                    wait = max(wait, (tokens - self._tokens_left) * 60 / self.tpm)
+
+                if not wait:
+                    self._requests_left -= 1
+                    self._tokens_left -= tokens
+                    return
+
+            time.sleep(wait)
+
+    def backoff(self):
+        """Lower the request rate by 10% for the next minute."""
+        with self._lock:
+            self._rate_factor = max(0.1, self._rate_factor * 0.9)
+            self._penalty_until = time.monotonic() + 60
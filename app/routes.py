@@ -1,118 +1,290 @@
-from flask import Blueprint, jsonify, request, render_template, Response
-from app import db
-from app.models import Lead, LeadStatus
+from flask import Blueprint, current_app, jsonify, request, render_template, Response, stream_with_context
+from app import db, cache
+from app.models import (
+    Lead, LeadKeyword, LeadStatus, JobStatus, ResearchJob, LETTER_STATUSES, STATUS_OPTIONS_SET,
+    keyword_key, sync_lead_keywords
+)
+from app.tasks import enqueue_research, enqueue_research_batch, research_query
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import bindparam, func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import raiseload
 import csv
+import hashlib
 import io
+import json
 from datetime import datetime
+from functools import lru_cache
 
 main_bp = Blueprint('main', __name__)
 api_bp = Blueprint('api', __name__)
 
 
+@lru_cache(maxsize=1)
+def _index_page():
+    # The dashboard template has no per-request context, so it is rendered once
+    body = render_template('index.html').encode('utf-8')
+    return body, hashlib.md5(body).hexdigest()
+
+
 # Main route - serve the dashboard
 @main_bp.route('/')
 def index():
-    return render_template('index.html')
+    if current_app.debug:
+        # Pick up template edits while developing
+        return render_template('index.html')
+
+    body, etag = _index_page()
+    response = Response(body, mimetype='text/html', headers={'Cache-Control': 'public, max-age=300'})
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+# Largest value the database drivers can bind as an integer (signed 64 bit)
+MAX_DB_INTEGER = 2 ** 63 - 1
 
 
 # API Routes
 @api_bp.route('/leads', methods=['GET'])
+@cache.cached(query_string=True)
 def get_leads():
-    """Get all leads with optional filtering."""
+    """
+    Get a page of leads with optional filtering.
+
+    Only the list columns are loaded; use GET /leads/<id> for the full lead.
+    Query parameters: status, keyword (whole keyword, case-insensitive), page (default 1),
+    per_page (default 50, max 200), cursor (next_cursor of the previous page; replaces
+    page and skips no rows when leads are added in between).
+    """
     status_filter = request.args.get('status')
-    keyword_filter = request.args.get('keyword')
+    keyword_filter = keyword_key(request.args.get('keyword') or '')
+    cursor = request.args.get('cursor')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+    if (page - 1) * per_page > MAX_DB_INTEGER:
+        return jsonify({'error': 'Ungültige Seite'}), 400
+
+    page_stmt, count_stmt = _lead_list_statements(bool(status_filter), bool(keyword_filter), bool(cursor))
+    params = {'status': status_filter, 'keyword': keyword_filter}
+
+    if cursor:
+        try:
+            cursor_ts, cursor_id = _parse_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Ungültiger Cursor'}), 400
+        page_params = {**params, 'cursor_ts': cursor_ts, 'cursor_id': cursor_id, 'limit': per_page}
+    else:
+        page_params = {**params, 'limit': per_page, 'offset': (page - 1) * per_page}
+
+    # Plain column rows instead of ORM instances: no identity map or attribute instrumentation
+    rows = db.session.execute(page_stmt, page_params).mappings()
+
+    items = []
+    for row in rows:
+        item = dict(row)
+        item['keywords'] = item['keywords'] or []
+        items.append(item)
+
+    total = db.session.scalar(count_stmt, params)
+
+    next_cursor = None
+    if len(items) == per_page and items[-1]['erstellt_am']:
+        next_cursor = f"{items[-1]['erstellt_am'].isoformat()}_{items[-1]['id']}"
 
-    query = Lead.query
+    return jsonify({
+        'items': items,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'next_cursor': next_cursor
+    })
 
-    if status_filter:
-        query = query.filter(Lead.status == status_filter)
 
-    if keyword_filter:
-        query = query.filter(Lead.keywords.contains(keyword_filter))
+def _parse_cursor(cursor):
+    """Split a lead list cursor ("<erstellt_am ISO>_<id>") into its values; raises ValueError."""
+    timestamp, _, lead_id = cursor.rpartition('_')
+    lead_id = int(lead_id)
+    if not -MAX_DB_INTEGER <= lead_id <= MAX_DB_INTEGER:
+        raise ValueError('lead id out of range')
+    return datetime.fromisoformat(timestamp), lead_id
 
-    leads = query.order_by(Lead.erstellt_am.desc()).all()
-    return jsonify([lead.to_dict() for lead in leads])
+
+@lru_cache(maxsize=8)
+def _lead_list_statements(by_status, by_keyword, by_cursor):
+    """
+    (page, count) statements for the lead list, built once per filter combination.
+
+    Values are bound at execution time (status, keyword, cursor, limit, offset),
+    so the same statement objects are reused and hit SQLAlchemy's compiled cache.
+    Cursor pages seek past the last (erstellt_am, id) instead of using an offset.
+    """
+    conditions = []
+    if by_status:
+        conditions.append(Lead.status == bindparam('status'))
+    if by_keyword:
+        # Whole keyword, case-insensitive (both sides are keyword_key()): a primary key lookup
+        conditions.append(Lead.id.in_(select(LeadKeyword.lead_id).where(LeadKeyword.keyword == bindparam('keyword'))))
+
+    page_stmt = (
+        select(*(getattr(Lead, column) for column in Lead.LIST_COLUMNS))
+        .where(*conditions)
+        .order_by(Lead.erstellt_am.desc(), Lead.id.desc())
+        .limit(bindparam('limit'))
+    )
+    count_stmt = select(func.count(Lead.id)).where(*conditions)
+
+    if by_cursor:
+        cursor_values = tuple_(
+            bindparam('cursor_ts', type_=Lead.erstellt_am.type), bindparam('cursor_id', type_=Lead.id.type)
+        )
+        page_stmt = page_stmt.where(tuple_(Lead.erstellt_am, Lead.id) < cursor_values)
+    else:
+        page_stmt = page_stmt.offset(bindparam('offset'))
+    return page_stmt, count_stmt
 
 
 @api_bp.route('/leads/<int:lead_id>', methods=['GET'])
 def get_lead(lead_id):
-    """Get a single lead by ID."""
+    """Get a single lead by ID (answers 304 if the client's ETag is still current)."""
     lead = Lead.query.get_or_404(lead_id)
-    return jsonify(lead.to_dict())
 
+    # aktualisiert_am changes on every write, so it identifies the version
+    etag = f'{lead.id}-{lead.aktualisiert_am.timestamp()}' if lead.aktualisiert_am else None
+    if etag and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(lead.to_dict())
+
+    if etag:
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, must-revalidate'
+    return response
+
+
+def _lead_data_error(data, creating):
+    """Validate lead request data. Returns an error message, or None if it is usable."""
+    if not isinstance(data, dict):
+        return 'Ungültige Lead-Daten'
+    if (creating or 'titel' in data) and not (isinstance(data.get('titel'), str) and data['titel'].strip()):
+        return 'Titel ist erforderlich'
+    return None
+
+
+def _is_duplicate_url(error):
+    """True if an IntegrityError comes from the unique quelle_url index (one lead per job posting)."""
+    return 'quelle_url' in str(error.orig)
 
-@api_bp.route('/leads', methods=['POST'])
-def create_lead():
-    """Create a new lead."""
-    data = request.json
 
-    lead = Lead(
+def _new_lead(data):
+    """Build a new lead from request data (not yet added to the session)."""
+    return Lead(
         titel=data.get('titel'),
         quelle=data.get('quelle', 'StepStone'),
-        quelle_url=data.get('quelle_url'),
-        keywords=','.join(data.get('keywords', [])) if isinstance(data.get('keywords'), list) else data.get('keywords'),
+        quelle_url=data.get('quelle_url') or None,
+        standort=data.get('standort'),
+        keywords=Lead.normalize_keywords(data.get('keywords')),
         textvorschau=data.get('textvorschau'),
         firmenname=data.get('firmenname'),
         status=LeadStatus.NEU.value
     )
 
+
+@api_bp.route('/leads', methods=['POST'])
+def create_lead():
+    """Create a new lead."""
+    data = request.get_json(silent=True)
+    error = _lead_data_error(data, creating=True)
+    if error:
+        return jsonify({'error': error}), 400
+
+    lead = _new_lead(data)
+
     db.session.add(lead)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if not _is_duplicate_url(e):
+            raise
+        return jsonify({'error': 'Ein Lead mit dieser URL existiert bereits'}), 409
 
     return jsonify(lead.to_dict()), 201
 
 
+# Lead fields that may be changed through PUT /leads/<id>
+UPDATABLE_FIELDS = frozenset({
+    'titel', 'quelle_url', 'standort', 'keywords', 'textvorschau', 'volltext', 'firmenname',
+    'firmen_website', 'firmen_adresse', 'firmen_email',
+    'ansprechpartner_name', 'ansprechpartner_rolle', 'ansprechpartner_linkedin', 'ansprechpartner_quelle',
+    'anschreiben', 'status'
+})
+
+
+def _apply_update(lead, data):
+    """Copy whitelisted, actually different values from data onto lead. Returns True if anything changed."""
+    data = dict(data)
+    if 'keywords' in data:
+        data['keywords'] = Lead.normalize_keywords(data['keywords'])
+    if 'quelle_url' in data:
+        data['quelle_url'] = data['quelle_url'] or None
+
+    changed = False
+    for field in UPDATABLE_FIELDS.intersection(data):
+        value = data[field]
+        if getattr(lead, field) != value:
+            setattr(lead, field, value)
+            changed = True
+    return changed
+
+
 @api_bp.route('/leads/<int:lead_id>', methods=['PUT'])
 def update_lead(lead_id):
-    """Update an existing lead."""
+    """Update an existing lead. Unchanged values are skipped; a no-op PUT writes nothing."""
+    from app.perplexity import PerplexityService
+
     lead = Lead.query.get_or_404(lead_id)
-    data = request.json
+    data = request.get_json(silent=True) or {}
 
-    # Update fields if provided
-    if 'titel' in data:
-        lead.titel = data['titel']
-    if 'quelle_url' in data:
-        lead.quelle_url = data['quelle_url']
-    if 'keywords' in data:
-        lead.keywords = ','.join(data['keywords']) if isinstance(data['keywords'], list) else data['keywords']
-    if 'textvorschau' in data:
-        lead.textvorschau = data['textvorschau']
-    if 'volltext' in data:
-        lead.volltext = data['volltext']
-    if 'firmenname' in data:
-        lead.firmenname = data['firmenname']
-    if 'firmen_website' in data:
-        lead.firmen_website = data['firmen_website']
-    if 'firmen_adresse' in data:
-        lead.firmen_adresse = data['firmen_adresse']
-    if 'firmen_email' in data:
-        lead.firmen_email = data['firmen_email']
-    if 'ansprechpartner_name' in data:
-        lead.ansprechpartner_name = data['ansprechpartner_name']
-    if 'ansprechpartner_rolle' in data:
-        lead.ansprechpartner_rolle = data['ansprechpartner_rolle']
-    if 'ansprechpartner_linkedin' in data:
-        lead.ansprechpartner_linkedin = data['ansprechpartner_linkedin']
-    if 'ansprechpartner_quelle' in data:
-        lead.ansprechpartner_quelle = data['ansprechpartner_quelle']
-    if 'anschreiben' in data:
-        lead.anschreiben = data['anschreiben']
-    if 'status' in data:
-        lead.status = data['status']
+    error = _lead_data_error(data, creating=False)
+    if error:
+        return jsonify({'error': error}), 400
+
+    cached_query = research_query(lead)
+
+    if not _apply_update(lead, data):
+        return jsonify(lead.to_dict())
+
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if not _is_duplicate_url(e):
+            raise
+        return jsonify({'error': 'Ein Lead mit dieser URL existiert bereits'}), 409
+
+    # Manual edits supersede any cached research result for this company
+    PerplexityService.invalidate(**cached_query)
 
-    db.session.commit()
     return jsonify(lead.to_dict())
 
 
+def _activate(lead):
+    """Move a new lead to AKTIVIERT. Returns an error message if that isn't allowed."""
+    if lead.status != LeadStatus.NEU.value:
+        return 'Lead ist bereits aktiviert'
+    lead.status = LeadStatus.AKTIVIERT.value
+    return None
+
+
 @api_bp.route('/leads/<int:lead_id>/activate', methods=['POST'])
 def activate_lead(lead_id):
     """Activate a lead and trigger research."""
     lead = Lead.query.get_or_404(lead_id)
 
-    if lead.status != LeadStatus.NEU.value:
-        return jsonify({'error': 'Lead ist bereits aktiviert'}), 400
+    error = _activate(lead)
+    if error:
+        return jsonify({'error': error}), 400
 
-    lead.status = LeadStatus.AKTIVIERT.value
     db.session.commit()
 
     return jsonify(lead.to_dict())
@@ -124,48 +296,81 @@ def research_lead(lead_id):
     Research company information for a lead using Perplexity AI.
     Finds real company data: website, address, email, and decision makers.
     No activation required - can be called from any lead status.
+
+    Returns 202 with a job; the research itself runs in the background.
+    Query parameter force=1 ignores cached (including empty) results.
     """
     from app.perplexity import PerplexityService
 
     lead = Lead.query.get_or_404(lead_id)
 
-    # Research can be triggered from any status - no restrictions
-    try:
-        perplexity = PerplexityService()
+    # Fail fast instead of queueing a job that can only fail
+    if not PerplexityService().api_key:
+        return jsonify({'error': 'PERPLEXITY_API_KEY not configured'}), 500
 
-        # Research company information
-        research_result = perplexity.research_company(
-            company_name=lead.firmenname or "Unbekannt",
-            job_title=lead.titel,
-            location=lead.standort
-        )
+    # The Perplexity round-trip runs in the background; poll /api/jobs/<job_id>
+    force = request.args.get('force', '').lower() in ('1', 'true')
+    job = enqueue_research(lead.id, force=force)
 
-        # Update lead with researched data (only if we found something)
-        if research_result.get('firmen_website'):
-            lead.firmen_website = research_result['firmen_website']
-        if research_result.get('firmen_adresse'):
-            lead.firmen_adresse = research_result['firmen_adresse']
-        if research_result.get('firmen_email'):
-            lead.firmen_email = research_result['firmen_email']
-        if research_result.get('ansprechpartner_name'):
-            lead.ansprechpartner_name = research_result['ansprechpartner_name']
-        if research_result.get('ansprechpartner_rolle'):
-            lead.ansprechpartner_rolle = research_result['ansprechpartner_rolle']
-        if research_result.get('ansprechpartner_linkedin'):
-            lead.ansprechpartner_linkedin = research_result['ansprechpartner_linkedin']
-            lead.ansprechpartner_quelle = 'LinkedIn (via Perplexity)'
-
-        # Update status to recherchiert
-        lead.status = LeadStatus.RECHERCHIERT.value
-        db.session.commit()
+    return jsonify(job.to_dict()), 202
 
-        return jsonify(lead.to_dict())
 
-    except ValueError as e:
-        return jsonify({'error': str(e)}), 500
-    except Exception as e:
-        print(f"Research error for lead {lead_id}: {e}")
-        return jsonify({'error': f'Recherche fehlgeschlagen: {str(e)}'}), 500
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the state of a background research job (includes the lead once finished)."""
+    job = db.get_or_404(ResearchJob, job_id)
+
+    result = job.to_dict()
+    if job.status == JobStatus.FINISHED.value:
+        lead = db.session.get(Lead, job.lead_id)
+        result['lead'] = lead.to_dict() if lead else None
+
+    return jsonify(result)
+
+
+@api_bp.route('/leads/research-batch', methods=['POST'])
+def research_leads_batch():
+    """
+    Research several leads at once.
+
+    Companies are packed into as few Perplexity prompts as possible and the
+    prompts run concurrently in the background. Returns 202 with one job per
+    lead; poll /api/jobs/<job_id> for each.
+
+    Request body:
+    {
+        "lead_ids": [1, 2, 3]
+    }
+    """
+    from app.perplexity import PerplexityService
+
+    data = request.get_json(silent=True) or {}
+    lead_ids = data.get('lead_ids', []) if isinstance(data, dict) else None
+
+    if not isinstance(lead_ids, list) or not all(isinstance(lead_id, int) and not isinstance(lead_id, bool) for lead_id in lead_ids):
+        return jsonify({'error': 'Ungültige lead_ids'}), 400
+    if not lead_ids:
+        return jsonify({'error': 'Keine Leads zum Recherchieren'}), 400
+    if len(lead_ids) > 50:
+        return jsonify({'error': 'Maximal 50 Leads pro Recherche'}), 400
+
+    # Fail fast instead of queueing jobs that can only fail
+    if not PerplexityService().api_key:
+        return jsonify({'error': 'PERPLEXITY_API_KEY not configured'}), 500
+
+    found = set(db.session.scalars(select(Lead.id).where(Lead.id.in_(lead_ids))))
+    not_found = [lead_id for lead_id in lead_ids if lead_id not in found]
+    if not found:
+        return jsonify({'error': 'Lead nicht gefunden'}), 404
+
+    # The Perplexity round-trips outlast a gunicorn worker timeout, so they run in the background
+    jobs = enqueue_research_batch(list(dict.fromkeys(lead_id for lead_id in lead_ids if lead_id in found)))
+
+    return jsonify({
+        'jobs': [job.to_dict() for job in jobs],
+        'not_found': not_found,
+        'message': f'Recherche für {len(jobs)} Leads gestartet'
+    }), 202
 
 
 @api_bp.route('/leads/<int:lead_id>/generate-letter', methods=['POST'])
@@ -173,33 +378,24 @@ def generate_letter(lead_id):
     """Generate a personalized cover letter for a lead."""
     lead = Lead.query.get_or_404(lead_id)
 
-    if lead.status not in [LeadStatus.RECHERCHIERT.value, LeadStatus.ANSCHREIBEN_ERSTELLT.value,
-                           LeadStatus.ANGESCHRIEBEN.value, LeadStatus.ANTWORT_ERHALTEN.value]:
+    if lead.status not in LETTER_STATUSES:
         return jsonify({'error': 'Lead muss zuerst recherchiert werden'}), 400
 
-    # Get optional custom template from request
-    data = request.json or {}
+    # Get optional sender data from request (the dashboard sends no body)
+    data = request.get_json(silent=True) or {}
     absender_name = data.get('absender_name', '[Ihr Name]')
     absender_firma = data.get('absender_firma', '[Ihre Firma]')
 
-    # Generate personalized letter
-    lead.anschreiben = f"""Sehr geehrte/r {lead.ansprechpartner_name or 'Damen und Herren'},
-
-mit großem Interesse habe ich Ihre Stellenanzeige "{lead.titel}" auf {lead.quelle} gelesen.
-
-Als Experte im Bereich KI und digitale Transformation bin ich überzeugt, dass ich {lead.firmenname or 'Ihr Unternehmen'} bei der erfolgreichen Implementierung von KI-Lösungen unterstützen kann.
-
-Besonders angesprochen hat mich:
-- Der Fokus auf innovative KI-Technologien
-- Die Möglichkeit, an zukunftsweisenden Projekten mitzuarbeiten
-- Die Vision Ihres Unternehmens im Bereich digitaler Innovation
-
-Ich würde mich sehr freuen, in einem persönlichen Gespräch zu erläutern, wie ich {lead.firmenname or 'Ihr Unternehmen'} mit meiner Expertise unterstützen kann.
-
-Mit freundlichen Grüßen
-{absender_name}
-{absender_firma}
-"""
+    # Generate personalized letter (template is compiled once and cached by Jinja)
+    lead.anschreiben = render_template(
+        'anschreiben.txt',
+        ansprechpartner_name=lead.ansprechpartner_name,
+        titel=lead.titel,
+        quelle=lead.quelle,
+        firmenname=lead.firmenname,
+        absender_name=absender_name,
+        absender_firma=absender_firma
+    )
 
     lead.status = LeadStatus.ANSCHREIBEN_ERSTELLT.value
     db.session.commit()
@@ -207,17 +403,24 @@ Mit freundlichen Grüßen
     return jsonify(lead.to_dict())
 
 
+def _set_status(lead, new_status):
+    """Set a lead's status. Returns an error message for unknown statuses."""
+    if new_status not in STATUS_OPTIONS_SET:
+        return 'Ungültiger Status'
+    lead.status = new_status
+    return None
+
+
 @api_bp.route('/leads/<int:lead_id>/status', methods=['PUT'])
 def update_status(lead_id):
     """Update the status of a lead."""
     lead = Lead.query.get_or_404(lead_id)
     data = request.json
 
-    new_status = data.get('status')
-    if new_status not in Lead.get_status_options():
-        return jsonify({'error': 'Ungültiger Status'}), 400
+    error = _set_status(lead, data.get('status'))
+    if error:
+        return jsonify({'error': error}), 400
 
-    lead.status = new_status
     db.session.commit()
 
     return jsonify(lead.to_dict())
@@ -232,84 +435,254 @@ def delete_lead(lead_id):
     return jsonify({'message': 'Lead gelöscht'}), 200
 
 
+MAX_BATCH_OPERATIONS = 100
+
+
+def _batch_lead_id(operation):
+    """lead_id of a batch operation, or None if it is missing or not an integer."""
+    lead_id = operation.get('lead_id') if isinstance(operation, dict) else None
+    return lead_id if isinstance(lead_id, int) and not isinstance(lead_id, bool) else None
+
+
+@api_bp.route('/leads/batch', methods=['POST'])
+def batch_leads():
+    """
+    Run several lead operations in one request and one transaction.
+
+    Request body:
+    {
+        "operations": [
+            {"op": "create", "data": {...}},
+            {"op": "update", "lead_id": 1, "data": {...}},
+            {"op": "activate", "lead_id": 2},
+            {"op": "status", "lead_id": 3, "data": {"status": "angeschrieben"}},
+            {"op": "delete", "lead_id": 4},
+            {"op": "research", "lead_id": 5}
+        ]
+    }
+
+    Returns one {"status", "body"|"error"} entry per operation. Operations that fail
+    validation (malformed entry, missing titel or lead_id) get a 400 entry and are
+    skipped; if the commit itself fails (duplicate URL) nothing is saved.
+    Research jobs are started after the commit.
+    """
+    from app.perplexity import PerplexityService
+
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations', []) if isinstance(data, dict) else None
+
+    if not isinstance(operations, list):
+        return jsonify({'error': 'Operationen müssen als Liste angegeben werden'}), 400
+    if not operations:
+        return jsonify({'error': 'Keine Operationen angegeben'}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'Maximal {MAX_BATCH_OPERATIONS} Operationen pro Anfrage'}), 400
+
+    # One query for every lead the batch refers to
+    lead_ids = {_batch_lead_id(operation) for operation in operations} - {None}
+    leads = {lead.id: lead for lead in Lead.query.options(raiseload('*')).filter(Lead.id.in_(lead_ids))} if lead_ids else {}
+
+    # Per operation: (status, lead to serialize after the commit) or (status, {'error'|'message': ...})
+    results = []
+    invalidate = []
+    research = []
+
+    for operation in operations:
+        if not isinstance(operation, dict) or not isinstance(operation.get('data') or {}, dict):
+            results.append((400, {'error': 'Ungültige Operation'}))
+            continue
+
+        op = operation.get('op')
+        op_data = operation.get('data') or {}
+
+        if op == 'create':
+            error = _lead_data_error(op_data, creating=True)
+            if error:
+                results.append((400, {'error': error}))
+                continue
+            lead = _new_lead(op_data)
+            db.session.add(lead)
+            results.append((201, lead))
+            continue
+
+        if op not in ('update', 'activate', 'status', 'delete', 'research'):
+            results.append((400, {'error': f'Unbekannte Operation: {op}'}))
+            continue
+
+        lead_id = _batch_lead_id(operation)
+        if lead_id is None:
+            results.append((400, {'error': 'Ungültige lead_id'}))
+            continue
+
+        lead = leads.get(lead_id)
+        if lead is None:
+            results.append((404, {'error': 'Lead nicht gefunden'}))
+            continue
+
+        if op == 'update':
+            error = _lead_data_error(op_data, creating=False)
+            if error:
+                results.append((400, {'error': error}))
+                continue
+            cached_query = research_query(lead)
+            if _apply_update(lead, op_data):
+                invalidate.append(cached_query)
+            results.append((200, lead))
+        elif op == 'activate':
+            error = _activate(lead)
+            results.append((400, {'error': error}) if error else (200, lead))
+        elif op == 'status':
+            error = _set_status(lead, op_data.get('status'))
+            results.append((400, {'error': error}) if error else (200, lead))
+        elif op == 'delete':
+            db.session.delete(lead)
+            del leads[lead.id]
+            results.append((200, {'message': 'Lead gelöscht'}))
+        else:
+            if not PerplexityService().api_key:
+                results.append((500, {'error': 'PERPLEXITY_API_KEY not configured'}))
+                continue
+            research.append((len(results), lead.id))
+            results.append((202, None))
+
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if not _is_duplicate_url(e):
+            raise
+        return jsonify({'error': 'Ein Lead mit dieser URL existiert bereits - keine Änderung gespeichert'}), 409
+
+    for cached_query in invalidate:
+        PerplexityService.invalidate(**cached_query)
+
+    # Jobs are queued only once the batch's own changes are committed
+    for index, lead_id in research:
+        results[index] = (202, enqueue_research(lead_id).to_dict())
+
+    response = []
+    for status, body in results:
+        if isinstance(body, Lead):
+            body = body.to_dict()
+        response.append({'status': status, 'error': body['error']} if status >= 400 else {'status': status, 'body': body})
+
+    return jsonify({'results': response})
+
+
+# Lead columns written by the CSV export (volltext/textvorschau are never read)
+EXPORT_COLUMNS = (
+    'id', 'titel', 'quelle', 'quelle_url', 'standort', 'keywords', 'status',
+    'firmenname', 'firmen_website', 'firmen_adresse', 'firmen_email',
+    'ansprechpartner_name', 'ansprechpartner_rolle', 'ansprechpartner_linkedin',
+    'anschreiben', 'erstellt_am', 'aktualisiert_am'
+)
+
+# Rows fetched from the cursor and written per yielded chunk
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_row(row):
+    """Format one EXPORT_COLUMNS row for the CSV writer."""
+    return (
+        row.id,
+        row.titel,
+        row.quelle,
+        row.quelle_url,
+        row.standort,
+        ','.join(row.keywords or []),
+        row.status,
+        row.firmenname,
+        row.firmen_website,
+        row.firmen_adresse,
+        row.firmen_email,
+        row.ansprechpartner_name,
+        row.ansprechpartner_rolle,
+        row.ansprechpartner_linkedin,
+        row.anschreiben,
+        row.erstellt_am.isoformat() if row.erstellt_am else '',
+        row.aktualisiert_am.isoformat() if row.aktualisiert_am else ''
+    )
+
+
 @api_bp.route('/leads/export', methods=['GET'])
 def export_leads():
-    """Export all leads as CSV."""
-    leads = Lead.query.all()
-
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output, delimiter=';', quotechar='"')
-
-    # Header
-    writer.writerow([
-        'ID', 'Titel', 'Quelle', 'URL', 'Keywords', 'Status',
-        'Firmenname', 'Website', 'Adresse', 'E-Mail',
-        'Ansprechpartner', 'Rolle', 'LinkedIn',
-        'Anschreiben', 'Erstellt am', 'Aktualisiert am'
-    ])
-
-    # Data rows
-    for lead in leads:
+    """Export all leads as CSV, streamed in batches so memory stays flat."""
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';', quotechar='"')
+
+        # Header
         writer.writerow([
-            lead.id,
-            lead.titel,
-            lead.quelle,
-            lead.quelle_url,
-            lead.keywords,
-            lead.status,
-            lead.firmenname,
-            lead.firmen_website,
-            lead.firmen_adresse,
-            lead.firmen_email,
-            lead.ansprechpartner_name,
-            lead.ansprechpartner_rolle,
-            lead.ansprechpartner_linkedin,
-            lead.anschreiben,
-            lead.erstellt_am.isoformat() if lead.erstellt_am else '',
-            lead.aktualisiert_am.isoformat() if lead.aktualisiert_am else ''
+            'ID', 'Titel', 'Quelle', 'URL', 'Standort', 'Keywords', 'Status',
+            'Firmenname', 'Website', 'Adresse', 'E-Mail',
+            'Ansprechpartner', 'Rolle', 'LinkedIn',
+            'Anschreiben', 'Erstellt am', 'Aktualisiert am'
         ])
+        yield buffer.getvalue()
 
-    output.seek(0)
+        # Plain column rows from a server-side cursor: nothing enters the identity map
+        result = db.session.execute(
+            select(*(getattr(Lead, column) for column in EXPORT_COLUMNS))
+            .order_by(Lead.id)
+            .execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        )
+
+        # Data rows, one chunk per batch
+        for rows in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(_export_row(row) for row in rows)
+            yield buffer.getvalue()
 
     return Response(
-        output.getvalue(),
+        stream_with_context(generate()),
         mimetype='text/csv',
         headers={'Content-Disposition': f'attachment; filename=leads_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'}
     )
 
 
+def _constant_json(data):
+    """Serialized body and ETag for data that never changes while the app runs."""
+    body = json.dumps(data)
+    return body, hashlib.md5(body.encode()).hexdigest()
+
+
+def _constant_json_response(body, etag):
+    """Response for constant data: cacheable by clients for a day, 304 on a matching ETag."""
+    response = Response(body, mimetype='application/json', headers={'Cache-Control': 'public, max-age=86400'})
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+@lru_cache(maxsize=1)
+def _status_options_json():
+    return _constant_json(Lead.get_status_options())
+
+
 @api_bp.route('/status-options', methods=['GET'])
 def get_status_options():
-    """Get all available status options."""
-    return jsonify(Lead.get_status_options())
+    """Get all available status options (static, so serialized once and cacheable by clients)."""
+    return _constant_json_response(*_status_options_json())
 
 
 @api_bp.route('/stats', methods=['GET'])
 def get_stats():
     """Get lead statistics by status."""
-    from sqlalchemy import func
-
-    # Get counts per status
+    # Get counts per status (one GROUP BY, served by the status index)
     status_counts = db.session.query(
         Lead.status, func.count(Lead.id)
     ).group_by(Lead.status).all()
 
     # Build stats dict
-    stats = {
-        'total': Lead.query.count(),
-        'neu': 0,
-        'aktiviert': 0,
-        'recherchiert': 0,
-        'anschreiben_erstellt': 0,
-        'angeschrieben': 0,
-        'antwort_erhalten': 0
-    }
+    stats = {status: 0 for status in Lead.get_status_options()}
 
     for status, count in status_counts:
         if status in stats:
             stats[status] = count
 
+    # Total includes leads with unknown or missing status as well
+    stats['total'] = sum(count for _, count in status_counts)
+
     # Combined anschreiben count
     stats['anschreiben'] = (
         stats['anschreiben_erstellt'] +
@@ -376,6 +749,44 @@ def search_stepstone():
         }), 500
 
 
+def _job_to_lead_row(job, quelle_url):
+    """Column values for a new lead created from a StepStone job dict."""
+    return {
+        'titel': job.get('titel', 'Unbekannter Titel'),
+        'quelle': job.get('quelle', 'StepStone'),
+        'quelle_url': quelle_url,
+        'standort': job.get('standort'),
+        'keywords': Lead.normalize_keywords(job.get('keywords')),
+        'textvorschau': job.get('textvorschau'),
+        'firmenname': job.get('firmenname'),
+        'status': LeadStatus.NEU.value
+    }
+
+
+# Dialect-specific INSERT constructs that support ON CONFLICT DO NOTHING
+_CONFLICT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def _insert_leads(rows):
+    """
+    Bulk-insert lead rows in one statement (the caller commits).
+
+    Rows whose quelle_url is already stored, or repeated within `rows`, are
+    skipped by the unique index instead of a lookup beforehand.
+    Returns the number of inserted leads.
+    """
+    if not rows:
+        return 0
+
+    stmt = _CONFLICT_INSERTS[db.session.get_bind().dialect.name](Lead).on_conflict_do_nothing()
+    inserted = db.session.execute(stmt.returning(Lead.id, Lead.keywords), rows).all()
+    if inserted:
+        # Bulk inserts bypass the flush events that maintain keywords and the lead list cache
+        sync_lead_keywords(db.session.connection(), inserted)
+        db.session.info['leads_changed'] = True
+    return len(inserted)
+
+
 @api_bp.route('/stepstone/import', methods=['POST'])
 def import_stepstone_jobs():
     """
@@ -399,54 +810,54 @@ def import_stepstone_jobs():
     if not jobs:
         return jsonify({'error': 'Keine Jobs zum Importieren'}), 400
 
-    imported = 0
-    skipped = 0
-
-    for job in jobs:
-        # Check if already exists by URL
-        if job.get('quelle_url'):
-            existing = Lead.query.filter_by(quelle_url=job['quelle_url']).first()
-            if existing:
-                skipped += 1
-                continue
+    # Jobs that already exist (or appear twice in this import) are skipped by the insert
+    imported = _insert_leads([_job_to_lead_row(job, job.get('quelle_url') or None) for job in jobs])
+    db.session.commit()
+    skipped = len(jobs) - imported
 
-        # Create new lead
-        keywords = job.get('keywords', [])
-        if isinstance(keywords, list):
-            keywords = ','.join(keywords)
+    return jsonify({
+        'success': True,
+        'imported': imported,
+        'skipped': skipped,
+        'message': f'{imported} Leads importiert, {skipped} übersprungen (bereits vorhanden)'
+    })
 
-        lead = Lead(
-            titel=job.get('titel', 'Unbekannter Titel'),
-            quelle=job.get('quelle', 'StepStone'),
-            quelle_url=job.get('quelle_url'),
-            keywords=keywords,
-            textvorschau=job.get('textvorschau'),
-            firmenname=job.get('firmenname'),
-            status=LeadStatus.NEU.value
-        )
 
-        db.session.add(lead)
-        imported += 1
+@api_bp.route('/seed-demo', methods=['POST'])
+def seed_demo_data():
+    """Load the StepStone demo jobs as leads. Demo leads that already exist (same URL) are skipped."""
+    from app.stepstone import stepstone_service
 
+    demo_jobs = stepstone_service._get_demo_jobs()
+    imported = _insert_leads([_job_to_lead_row(job, job.get('quelle_url')) for job in demo_jobs])
     db.session.commit()
 
     return jsonify({
         'success': True,
         'imported': imported,
-        'skipped': skipped,
-        'message': f'{imported} Leads importiert, {skipped} übersprungen (bereits vorhanden)'
+        'message': f'{imported} Demo-Leads geladen'
     })
 
 
+@lru_cache(maxsize=1)
+def _regions_json():
+    from app.stepstone import StepStoneService
+    return _constant_json(StepStoneService.get_regions())
+
+
+@lru_cache(maxsize=1)
+def _ai_keywords_json():
+    from app.stepstone import StepStoneService
+    return _constant_json(StepStoneService.get_ai_keywords())
+
+
 @api_bp.route('/stepstone/regions', methods=['GET'])
 def get_stepstone_regions():
-    """Get available German regions for filtering."""
-    from app.stepstone import StepStoneService
-    return jsonify(StepStoneService.get_regions())
+    """Get available German regions for filtering (serialized once, cacheable by clients)."""
+    return _constant_json_response(*_regions_json())
 
 
 @api_bp.route('/stepstone/keywords', methods=['GET'])
 def get_ai_keywords():
-    """Get predefined AI-related keywords."""
-    from app.stepstone import StepStoneService
-    return jsonify(StepStoneService.get_ai_keywords())
+    """Get predefined AI-related keywords (serialized once, cacheable by clients)."""
+    return _constant_json_response(*_ai_keywords_json())
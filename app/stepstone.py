@@ -5,14 +5,227 @@ Scrapes job listings from StepStone.de based on search criteria.
 Falls back to demo data if scraping is not possible.
 """
 
+import os
+import lxml.html
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlencode, quote_plus
+from lxml import etree
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urljoin, quote_plus
 from datetime import datetime, timedelta
+from functools import lru_cache
 import re
 import json
-import time
-import random
+from app.caching import TTLCache
+from app.ratelimit import RateLimiter
+
+# Parsed search pages and job details by URL; identical searches from several
+# users within the TTL are answered without another request to StepStone
+PAGE_CACHE_TTL = 3600
+_page_cache = TTLCache(maxsize=512, ttl=PAGE_CACHE_TTL)
+
+# Pages that parsed to nothing (bot wall, consent page, changed markup) are only
+# kept briefly, so a bad answer doesn't hide a query's results for the full hour
+NEGATIVE_PAGE_CACHE_TTL = 60
+
+# Sustained request rate to StepStone from this process (search and detail pages);
+# lowered for a minute whenever StepStone still answers 429 after the retries
+_rate_limiter = RateLimiter(rpm=int(os.environ.get('STEPSTONE_RPM', 120)))
+
+
+class _CappedRetry(Retry):
+    """Retry that honours a Retry-After header only up to MAX_RETRY_AFTER seconds."""
+
+    # backoff_max only caps the computed backoff; urllib3 sleeps for Retry-After in full
+    MAX_RETRY_AFTER = 30
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, self.MAX_RETRY_AFTER)
+
+
+def _has_class(name):
+    """XPath predicate equivalent to the CSS class selector .name"""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+# XPath expressions, compiled once instead of on every call.
+# Job cards are tried in this order until one matches (StepStone changes its markup).
+_XP_JOB_CARDS = (
+    etree.XPath('//article[@data-testid="job-item"]'),
+    etree.XPath(f'//article[{_has_class("job-element")}]'),
+    etree.XPath('//*[@data-at="job-item"]'),
+    etree.XPath('//a[contains(@href, "/stellenangebote--")]'),
+)
+# The card/section lookups return the first matching descendant in document order
+_XP_TITLE = etree.XPath(
+    f'(.//*[self::h2 or self::h3 or @data-at="job-item-title" or {_has_class("job-element-title")}])[1]'
+)
+_XP_COMPANY = etree.XPath(
+    f'(.//*[@data-at="job-item-company-name" or {_has_class("job-element-company")} or @data-testid="company-name"])[1]'
+)
+_XP_LOCATION = etree.XPath(
+    f'(.//*[@data-at="job-item-location" or {_has_class("job-element-location")} or @data-testid="job-item-location"])[1]'
+)
+_XP_LINK = etree.XPath('(.//a[contains(@href, "/stellenangebote")])[1]')
+_XP_SNIPPET = etree.XPath(
+    f'(.//*[@data-at="job-item-snippet" or {_has_class("job-element-snippet")} or @data-testid="job-item-snippet"])[1]'
+)
+_XP_DESCRIPTION = etree.XPath(
+    f'(//*[@data-at="job-ad-content" or {_has_class("job-ad-content")} or @data-testid="job-ad-content"'
+    f' or {_has_class("listing-content")}])[1]'
+)
+_XP_COMPANY_INFO = etree.XPath(
+    f'(//*[@data-at="company-info" or {_has_class("company-info")} or @data-testid="company-info"])[1]'
+)
+_XP_EXTERNAL_LINK = etree.XPath('(.//a[contains(@href, "http")])[1]')
+
+
+def _first(xpath, node):
+    """Return the first result of a compiled XPath, or None."""
+    result = xpath(node)
+    return result[0] if result else None
+
+
+def _text(node, separator='', limit=None):
+    """
+    Stripped text content of a node, like BeautifulSoup's get_text(separator, strip=True).
+
+    With a limit, text nodes are only read until the result is long enough and
+    the text is cut to `limit` characters.
+    """
+    parts = []
+    length = 0
+    for part in node.itertext():
+        part = part.strip()
+        if not part:
+            continue
+        parts.append(part)
+        length += len(part) + len(separator)
+        if limit is not None and length >= limit:
+            break
+
+    text = separator.join(parts)
+    return text if limit is None else text[:limit]
+
+
+def _canonical_url(url):
+    """
+    Job URL without query string and fragment.
+
+    The same posting appears on several result pages with different tracking
+    parameters (?cid=..., utm_...); the path alone identifies it.
+    """
+    return url.split('#', 1)[0].split('?', 1)[0]
+
+
+# Comments and processing instructions are dropped while parsing. Server-rendered
+# pages put <!-- --> markers between text fragments, which would otherwise become
+# extra tree nodes and split titles like "KI<!-- --> Engineer" into separate text parts.
+_HTML_PARSER = lxml.html.HTMLParser(remove_comments=True, remove_pis=True)
+
+
+@lru_cache(maxsize=8)
+def _html_parser(encoding):
+    """Parser for raw bytes in a known encoding (None lets lxml read the <meta> charset)."""
+    if encoding is None:
+        return _HTML_PARSER
+    return lxml.html.HTMLParser(remove_comments=True, remove_pis=True, encoding=encoding)
+
+
+def _response_encoding(response):
+    """
+    Charset declared in the Content-Type header, else UTF-8 (what StepStone serves).
+
+    The body is decoded by lxml instead of response.text, which would guess the
+    encoding when none is declared.
+    """
+    if 'charset' in response.headers.get('Content-Type', '').lower():
+        return response.encoding
+    return 'utf-8'
+
+
+def _parse_html(html, encoding=None):
+    """Parse a page (str, or bytes in `encoding`) into an lxml tree; returns None for empty documents."""
+    if not html or not html.strip():
+        return None
+    if isinstance(html, bytes):
+        return lxml.html.document_fromstring(html, parser=_html_parser(encoding))
+    try:
+        return lxml.html.document_fromstring(html, parser=_HTML_PARSER)
+    except ValueError:
+        # lxml rejects str input that carries an XML encoding declaration
+        return lxml.html.document_fromstring(html.encode('utf-8'), parser=_HTML_PARSER)
+
+
+def _check_response(response):
+    """raise_for_status(), slowing down the shared rate limiter if StepStone is still throttling."""
+    if response.status_code == 429:
+        _rate_limiter.backoff()
+    response.raise_for_status()
+
+
+def _parse_html_stream(chunks, encoding):
+    """
+    Parse a page from byte chunks while they are still being received.
+
+    Parsing overlaps with the download instead of starting after the whole body
+    is buffered. Returns None for empty documents.
+    """
+    # Feed parsers keep state, so each page gets its own
+    parser = lxml.html.HTMLParser(remove_comments=True, remove_pis=True, encoding=encoding)
+    received = False
+    for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+            received = True
+    return parser.close() if received else None
+
+
+@lru_cache(maxsize=64)
+def _any_keyword_pattern(keywords):
+    """Compiled pattern matching any of the given literal (lowercase) keywords."""
+    return re.compile('|'.join(map(re.escape, keywords)))
+
+
+class KeywordMatcher:
+    """
+    Finds which of a fixed list of keywords occur in a text.
+
+    Same result as checking `kw.lower() in text.lower()` for every keyword,
+    but the text is scanned once by a single precompiled pattern.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+        lowered = {kw: kw.lower() for kw in self.keywords}
+        alternatives = sorted(set(lowered.values()), key=len, reverse=True)
+
+        # Plain alternation of literals: the regex engine skips ahead to possible
+        # first characters instead of trying a lookahead at every position
+        self._pattern = re.compile('|'.join(map(re.escape, alternatives)))
+
+        # At one position only the longest alternative matches; it implies
+        # every keyword it contains
+        self._implied = {
+            alternative: frozenset(kw for kw, kw_lower in lowered.items() if kw_lower in alternative)
+            for alternative in alternatives
+        }
+
+    def find(self, text):
+        """Return the keywords contained in text, in keyword-list order."""
+        text = text.lower()
+        search = self._pattern.search
+        found = set()
+        match = search(text)
+        while match is not None:
+            found |= self._implied[match.group()]
+            # Resume one character after the match start, so overlapping
+            # keywords ("ML" / "LLM") are all seen
+            match = search(text, match.start() + 1)
+        return [kw for kw in self.keywords if kw in found]
 
 
 class StepStoneService:
@@ -26,7 +239,8 @@ class StepStoneService:
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
         'Accept-Language': 'de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7',
-        'Accept-Encoding': 'gzip, deflate, br',
+        # Only what urllib3 can decode here (br with the Brotli package, zstd with zstandard)
+        'Accept-Encoding': ACCEPT_ENCODING,
         'Connection': 'keep-alive',
         'Upgrade-Insecure-Requests': '1',
     }
@@ -39,6 +253,7 @@ class StepStoneService:
         'NLP', 'Natural Language Processing', 'Computer Vision',
         'Neural Network', 'Data Science', 'Prompt Engineer'
     ]
+    KEYWORD_MATCHER = KeywordMatcher(AI_KEYWORDS)
 
     # German regions/states
     REGIONS = {
@@ -344,21 +559,61 @@ Wir bieten:
         },
     ]
 
-    def __init__(self):
+    # Demo rows with their URL and lowercased search fields, computed once:
+    # (demo, quelle_url, titel_lower, titel + textvorschau lowercased, standort_lower)
+    _DEMO_INDEX = tuple(
+        (
+            demo,
+            f'https://www.stepstone.de/stellenangebote--Demo-{number}-{demo["standort"]}',
+            demo['titel'].lower(),
+            f"{demo['titel']}\n{demo['textvorschau']}".lower(),
+            demo['standort'].lower()
+        )
+        for number, demo in enumerate(DEMO_JOBS, start=1)
+    )
+
+    # (connect, read) timeout for StepStone requests
+    REQUEST_TIMEOUT = (5, 15)
+
+    # Bytes handed to the parser at a time while a page is downloading
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    # StepStone requests in flight at once, shared by all searches of this process
+    # (the sustained rate is capped separately by _rate_limiter)
+    MAX_PARALLEL_FETCHES = 8
+
+    def __init__(self, demo_fallback=True):
+        # Whether search_jobs() answers with demo data when scraping yields nothing
+        self.demo_fallback = demo_fallback
+
         self.session = requests.Session()
         self.session.headers.update(self.HEADERS)
 
-    def build_search_url(self, keywords=None, location=None, radius=None, page=1, date_filter=None):
-        """Build StepStone search URL with parameters."""
-        url_parts = [self.SEARCH_URL]
-
-        if keywords:
-            url_parts.append(quote_plus(keywords))
+        # Sized keep-alive pool (default is 10) shared by search and detail fetches.
+        # Throttling (429) and transient server errors are retried with exponential
+        # backoff; a Retry-After header takes precedence over the computed delay.
+        # Either way no single wait exceeds 30 s.
+        adapter = HTTPAdapter(
+            pool_connections=20,
+            pool_maxsize=20,
+            max_retries=_CappedRetry(
+                total=3,
+                backoff_factor=0.5,
+                backoff_max=30,
+                status_forcelist=[429, 500, 502, 503, 504],
+                raise_on_status=False
+            )
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
-        if location:
-            url_parts.append(f"in-{quote_plus(location)}")
+        # Long-lived pool: searches reuse warm threads, and the pool size bounds
+        # the concurrent fetches across requests
+        self.executor = ThreadPoolExecutor(max_workers=self.MAX_PARALLEL_FETCHES, thread_name_prefix='stepstone')
 
-        url = "/".join(url_parts)
+    def build_search_url(self, keywords=None, location=None, radius=None, page=1, date_filter=None):
+        """Build StepStone search URL with parameters."""
+        url = self._search_path(keywords, location)
 
         params = {}
         if radius:
@@ -373,10 +628,24 @@ Wir bieten:
 
         return url
 
+    @classmethod
+    @lru_cache(maxsize=256)
+    def _search_path(cls, keywords, location):
+        """Quoted search path for keywords and location, shared by all pages of a search."""
+        url_parts = [cls.SEARCH_URL]
+
+        if keywords:
+            url_parts.append(quote_plus(keywords))
+
+        if location:
+            url_parts.append(f"in-{quote_plus(location)}")
+
+        return "/".join(url_parts)
+
     def search_jobs(self, keywords=None, location=None, radius=30, max_pages=3, date_filter=None, job_title_filter=None):
         """
         Search for jobs on StepStone.
-        Falls back to demo data if scraping fails.
+        Falls back to demo data if scraping fails (unless demo_fallback is off).
         """
         # Try real scraping first
         try:
@@ -384,118 +653,121 @@ Wir bieten:
             if all_jobs:
                 return all_jobs
         except Exception as e:
-            print(f"Scraping failed, using demo data: {e}")
+            print(f"Scraping failed: {e}")
+
+        if not self.demo_fallback:
+            return []
 
         # Fallback to demo data
         return self._get_demo_jobs(keywords, location, job_title_filter)
 
     def _scrape_jobs(self, keywords, location, radius, max_pages, date_filter, job_title_filter):
-        """Attempt to scrape real jobs from StepStone."""
-        all_jobs = []
-
-        for page in range(1, max_pages + 1):
-            url = self.build_search_url(
+        """Attempt to scrape real jobs from StepStone (result pages are fetched in parallel)."""
+        urls = [
+            self.build_search_url(
                 keywords=keywords,
                 location=location,
                 radius=radius,
                 page=page,
                 date_filter=date_filter
             )
+            for page in range(1, max_pages + 1)
+        ]
 
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
+        pages = list(self.executor.map(self._fetch_search_page, urls))
 
-            jobs = self._parse_search_results(response.text)
+        filter_lower = job_title_filter.lower() if job_title_filter else None
 
+        # Deduplicated while collecting (first occurrence wins); URLs are canonical already
+        unique_jobs = {}
+        for jobs in pages:
+            # Results end at the first empty page
             if not jobs:
                 break
 
-            if job_title_filter:
-                filter_lower = job_title_filter.lower()
-                jobs = [j for j in jobs if filter_lower in j.get('titel', '').lower()]
+            for job in jobs:
+                if filter_lower and filter_lower not in job.get('titel', '').lower():
+                    continue
+                unique_jobs.setdefault(job['quelle_url'], job)
 
-            all_jobs.extend(jobs)
+        return list(unique_jobs.values())
 
-            if page < max_pages:
-                time.sleep(1)
+    def _fetch_search_page(self, url):
+        """Fetch and parse one result page."""
+        cached = _page_cache.get(url)
+        if cached is not None:
+            return [dict(job) for job in cached]
 
-        # Remove duplicates
-        seen_urls = set()
-        unique_jobs = []
-        for job in all_jobs:
-            if job['quelle_url'] not in seen_urls:
-                seen_urls.add(job['quelle_url'])
-                unique_jobs.append(job)
+        _rate_limiter.acquire()
+        with self.session.get(url, timeout=self.REQUEST_TIMEOUT, stream=True) as response:
+            _check_response(response)
 
-        return unique_jobs
+            # Parsed in the worker thread as the body arrives; lxml releases the GIL while parsing
+            tree = _parse_html_stream(response.iter_content(self.STREAM_CHUNK_SIZE), _response_encoding(response))
+        jobs = self._extract_jobs(tree)
+        _page_cache.set(url, jobs, ttl=None if jobs else NEGATIVE_PAGE_CACHE_TTL)
+        return [dict(job) for job in jobs]
 
     def _get_demo_jobs(self, keywords=None, location=None, job_title_filter=None):
         """Generate demo job data based on search criteria."""
+        # Search terms are normalized once per call, not once per demo job
+        location_lower = location.lower() if location else None
+        location_title = location.title() if location else None
+        keyword_list = keywords.lower().replace(',', ' ').split() if keywords else None
+        keyword_pattern = _any_keyword_pattern(tuple(keyword_list)) if keyword_list else None
+        title_filter = job_title_filter.lower() if job_title_filter else None
+
         jobs = []
 
-        for i, demo in enumerate(self.DEMO_JOBS):
-            job = demo.copy()
-            job['quelle'] = 'StepStone'
-            job['quelle_url'] = f'https://www.stepstone.de/stellenangebote--Demo-{i+1}-{job["standort"]}'
+        for i, (demo, quelle_url, title_lower, text_lower, standort_lower) in enumerate(self._DEMO_INDEX):
+            standort = demo['standort']
 
             # Filter by location if specified
-            if location:
-                location_lower = location.lower()
-                if location_lower not in job['standort'].lower():
-                    # 30% chance to include anyway for variety
-                    if random.random() > 0.3:
-                        continue
-                    job['standort'] = location.title()
-
-            # Filter by keywords if specified
-            if keywords:
-                keywords_lower = keywords.lower()
-                title_lower = job['titel'].lower()
-                preview_lower = job['textvorschau'].lower()
-
-                # Check if any keyword matches
-                keyword_list = keywords_lower.replace(',', ' ').split()
-                matches = any(kw in title_lower or kw in preview_lower for kw in keyword_list)
-
-                if not matches:
+            if location_lower and location_lower not in standort_lower:
+                # Include every third-or-so job anyway for variety, picked by
+                # position so the same search always returns the same demo set
+                if i % 10 >= 3:
                     continue
+                standort = location_title
+
+            # Filter by keywords if specified (any keyword in title or preview)
+            if keyword_pattern and not keyword_pattern.search(text_lower):
+                continue
 
             # Filter by job title if specified
-            if job_title_filter:
-                if job_title_filter.lower() not in job['titel'].lower():
-                    continue
+            if title_filter and title_filter not in title_lower:
+                continue
 
-            jobs.append(job)
+            jobs.append({**demo, 'quelle': 'StepStone', 'quelle_url': quelle_url, 'standort': standort})
 
         # If no matches, return all demo jobs
         if not jobs:
-            jobs = []
-            for i, demo in enumerate(self.DEMO_JOBS):
-                job = demo.copy()
-                job['quelle'] = 'StepStone'
-                job['quelle_url'] = f'https://www.stepstone.de/stellenangebote--Demo-{i+1}-{demo["standort"]}'
-                if location:
-                    job['standort'] = location.title()
-                jobs.append(job)
+            jobs = [
+                {**demo, 'quelle': 'StepStone', 'quelle_url': quelle_url, 'standort': location_title or demo['standort']}
+                for demo, quelle_url, *_ in self._DEMO_INDEX
+            ]
 
         return jobs
 
-    def _parse_search_results(self, html):
+    def _parse_search_results(self, html, encoding=None):
         """Parse job listings from search results HTML."""
-        soup = BeautifulSoup(html, 'lxml')
+        return self._extract_jobs(_parse_html(html, encoding))
+
+    def _extract_jobs(self, tree):
+        """Extract the job listings from a parsed search results page (None: no jobs)."""
+        if tree is None:
+            return []
         jobs = []
 
-        job_cards = soup.select('article[data-testid="job-item"]')
-        if not job_cards:
-            job_cards = soup.select('article.job-element')
-        if not job_cards:
-            job_cards = soup.select('[data-at="job-item"]')
-        if not job_cards:
-            job_cards = soup.select('a[href*="/stellenangebote--"]')
+        job_cards = []
+        for xpath in _XP_JOB_CARDS:
+            job_cards = xpath(tree)
+            if job_cards:
+                break
 
         for card in job_cards:
             try:
-                job = self._extract_job_from_card(card, soup)
+                job = self._extract_job_from_card(card)
                 if job:
                     jobs.append(job)
             except Exception as e:
@@ -503,86 +775,102 @@ Wir bieten:
 
         return jobs
 
-    def _extract_job_from_card(self, card, soup):
+    def _extract_job_from_card(self, card):
         """Extract job data from a single job card element."""
         job = {
             'quelle': 'StepStone',
             'keywords': [],
         }
 
-        title_elem = card.select_one('h2, h3, [data-at="job-item-title"], .job-element-title')
-        if title_elem:
-            job['titel'] = title_elem.get_text(strip=True)
-        elif card.name == 'a':
-            job['titel'] = card.get_text(strip=True)
+        title_elem = _first(_XP_TITLE, card)
+        if title_elem is not None:
+            job['titel'] = _text(title_elem)
+        elif card.tag == 'a':
+            job['titel'] = _text(card)
 
         if not job.get('titel'):
             return None
 
-        company_elem = card.select_one('[data-at="job-item-company-name"], .job-element-company, [data-testid="company-name"]')
-        if company_elem:
-            job['firmenname'] = company_elem.get_text(strip=True)
+        company_elem = _first(_XP_COMPANY, card)
+        if company_elem is not None:
+            job['firmenname'] = _text(company_elem)
 
-        location_elem = card.select_one('[data-at="job-item-location"], .job-element-location, [data-testid="job-item-location"]')
-        if location_elem:
-            job['standort'] = location_elem.get_text(strip=True)
+        location_elem = _first(_XP_LOCATION, card)
+        if location_elem is not None:
+            job['standort'] = _text(location_elem)
 
-        link_elem = card.select_one('a[href*="/stellenangebote"]') or (card if card.name == 'a' else None)
-        if link_elem and link_elem.get('href'):
-            href = link_elem['href']
-            if href.startswith('/'):
-                job['quelle_url'] = self.BASE_URL + href
-            elif href.startswith('http'):
-                job['quelle_url'] = href
-            else:
-                job['quelle_url'] = self.BASE_URL + '/' + href
+        link_elem = _first(_XP_LINK, card)
+        if link_elem is None and card.tag == 'a':
+            link_elem = card
+        if link_elem is not None and link_elem.get('href'):
+            # Stored without tracking parameters, so the unique quelle_url index also
+            # catches a posting imported again from a different search
+            job['quelle_url'] = urljoin(self.BASE_URL + '/', _canonical_url(link_elem.get('href')))
 
         if not job.get('quelle_url'):
             return None
 
-        snippet_elem = card.select_one('[data-at="job-item-snippet"], .job-element-snippet, [data-testid="job-item-snippet"]')
-        if snippet_elem:
-            job['textvorschau'] = snippet_elem.get_text(strip=True)[:500]
+        snippet_elem = _first(_XP_SNIPPET, card)
+        if snippet_elem is not None:
+            job['textvorschau'] = _text(snippet_elem, limit=500)
 
-        title_lower = job['titel'].lower()
-        for kw in self.AI_KEYWORDS:
-            if kw.lower() in title_lower:
-                job['keywords'].append(kw)
+        job['keywords'] = self.KEYWORD_MATCHER.find(job['titel'])
 
         return job
 
     def get_job_details(self, url):
-        """Fetch full details for a single job posting."""
+        """Fetch full details for a single job posting (failed fetches return None and are not cached)."""
+        cached = _page_cache.get(url)
+        if cached is not None:
+            return dict(cached)
+
         try:
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-            return self._parse_job_details(response.text, url)
+            _rate_limiter.acquire()
+            with self.session.get(url, timeout=self.REQUEST_TIMEOUT, stream=True) as response:
+                _check_response(response)
+                # Parsed as the body arrives, like the search result pages
+                tree = _parse_html_stream(response.iter_content(self.STREAM_CHUNK_SIZE), _response_encoding(response))
         except requests.RequestException as e:
             return None
 
-    def _parse_job_details(self, html, url):
+        details = self._extract_job_details(tree)
+        _page_cache.set(url, details, ttl=None if details else NEGATIVE_PAGE_CACHE_TTL)
+        return dict(details)
+
+    def get_job_details_many(self, urls):
+        """
+        Fetch the details of several job postings concurrently.
+
+        Runs get_job_details() on the shared fetch pool, so at most
+        MAX_PARALLEL_FETCHES requests are in flight. Returns a list in the order
+        of `urls`; failed fetches yield None.
+        """
+        return list(self.executor.map(self.get_job_details, urls))
+
+    def _parse_job_details(self, html, url, encoding=None):
         """Parse full job details from job page HTML."""
-        soup = BeautifulSoup(html, 'lxml')
+        return self._extract_job_details(_parse_html(html, encoding))
+
+    def _extract_job_details(self, tree):
+        """Extract description, company website and keywords from a parsed job page (None: no details)."""
         details = {}
+        if tree is None:
+            return details
 
-        description_elem = soup.select_one('[data-at="job-ad-content"], .job-ad-content, [data-testid="job-ad-content"], .listing-content')
-        if description_elem:
-            details['volltext'] = description_elem.get_text(separator='\n', strip=True)
+        description_elem = _first(_XP_DESCRIPTION, tree)
+        if description_elem is not None:
+            details['volltext'] = _text(description_elem, separator='\n')
 
-        company_section = soup.select_one('[data-at="company-info"], .company-info, [data-testid="company-info"]')
-        if company_section:
-            website_link = company_section.select_one('a[href*="http"]')
-            if website_link:
+        company_section = _first(_XP_COMPANY_INFO, tree)
+        if company_section is not None:
+            website_link = _first(_XP_EXTERNAL_LINK, company_section)
+            if website_link is not None:
                 href = website_link.get('href', '')
                 if 'stepstone' not in href:
                     details['firmen_website'] = href
 
         if details.get('volltext'):
-            text_lower = details['volltext'].lower()
-            keywords = []
-            for kw in self.AI_KEYWORDS:
-                if kw.lower() in text_lower:
-                    keywords.append(kw)
+            keywords = self.KEYWORD_MATCHER.find(details['volltext'])
             if keywords:
                 details['keywords'] = keywords
 
@@ -600,4 +888,6 @@ Wir bieten:
 
 
 # Singleton instance
-stepstone_service = StepStoneService()
+stepstone_service = StepStoneService(
+    demo_fallback=os.environ.get('STEPSTONE_DEMO_FALLBACK', '1').lower() not in ('0', 'false')
+)
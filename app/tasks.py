@@ -0,0 +1,141 @@
+"""
+Background execution of slow work (Perplexity research) outside the request thread.
+
+Jobs run on an in-process thread pool; their state lives in the research_jobs
+table so any worker process can answer the polling requests.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from sqlalchemy import update
+
+from app import db
+from app.models import Lead, LeadStatus, JobStatus, ResearchJob
+from app.perplexity import PerplexityService
+
+RESEARCH_WORKERS = int(os.environ.get('RESEARCH_WORKERS', 4))
+
+_executor = ThreadPoolExecutor(max_workers=RESEARCH_WORKERS, thread_name_prefix='research')
+
+
+def research_query(lead):
+    """Build the research_company() arguments for a lead."""
+    return {
+        'company_name': lead.firmenname or "Unbekannt",
+        'job_title': lead.titel,
+        'location': lead.standort
+    }
+
+
+def apply_research(lead, research_result):
+    """Copy researched data onto a lead (only fields we actually found)."""
+    if research_result.get('firmen_website'):
+        lead.firmen_website = research_result['firmen_website']
+    if research_result.get('firmen_adresse'):
+        lead.firmen_adresse = research_result['firmen_adresse']
+    if research_result.get('firmen_email'):
+        lead.firmen_email = research_result['firmen_email']
+    if research_result.get('ansprechpartner_name'):
+        lead.ansprechpartner_name = research_result['ansprechpartner_name']
+    if research_result.get('ansprechpartner_rolle'):
+        lead.ansprechpartner_rolle = research_result['ansprechpartner_rolle']
+    if research_result.get('ansprechpartner_linkedin'):
+        lead.ansprechpartner_linkedin = research_result['ansprechpartner_linkedin']
+        lead.ansprechpartner_quelle = 'LinkedIn (via Perplexity)'
+
+    lead.status = LeadStatus.RECHERCHIERT.value
+
+
+def enqueue_research(lead_id, force=False):
+    """Create a research job for a lead and start it in the background (force bypasses the cache)."""
+    job = ResearchJob(lead_id=lead_id)
+    db.session.add(job)
+    db.session.commit()
+
+    _executor.submit(_run_research, current_app._get_current_object(), job.id, force)
+    return job
+
+
+def _run_research(app, job_id, force):
+    with app.app_context():
+        try:
+            job = db.session.get(ResearchJob, job_id)
+            job.status = JobStatus.RUNNING.value
+            db.session.commit()
+
+            lead = db.session.get(Lead, job.lead_id)
+            if lead is None:
+                raise LookupError('Lead wurde gelöscht')
+
+            research_result = PerplexityService().research_company(**research_query(lead), force=force)
+            apply_research(lead, research_result)
+            job.status = JobStatus.FINISHED.value
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception(f"Research error for job {job_id}")
+            _fail_jobs([job_id], f'Recherche fehlgeschlagen: {str(e)}')
+
+
+def _fail_jobs(job_ids, error):
+    """Mark jobs as failed in a fresh transaction, so a failed result commit can't leave them running."""
+    try:
+        db.session.execute(
+            update(ResearchJob)
+            .where(ResearchJob.id.in_(job_ids))
+            .values(status=JobStatus.FAILED.value, error=error)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception(f"Could not mark research jobs {job_ids} as failed")
+
+
+def enqueue_research_batch(lead_ids):
+    """Create one research job per lead and research them together (few shared prompts) in the background."""
+    jobs = [ResearchJob(lead_id=lead_id) for lead_id in lead_ids]
+    db.session.add_all(jobs)
+    db.session.commit()
+
+    _executor.submit(_run_research_batch, current_app._get_current_object(), [job.id for job in jobs])
+    return jobs
+
+
+def _run_research_batch(app, job_ids):
+    with app.app_context():
+        try:
+            jobs = db.session.query(ResearchJob).filter(ResearchJob.id.in_(job_ids)).all()
+            for job in jobs:
+                job.status = JobStatus.RUNNING.value
+            db.session.commit()
+
+            leads = {lead.id: lead for lead in Lead.query.filter(Lead.id.in_([job.lead_id for job in jobs]))}
+            found = [job for job in jobs if job.lead_id in leads]
+            results = PerplexityService().research_companies([research_query(leads[job.lead_id]) for job in found])
+            results = dict(zip((job.id for job in found), results))
+            lead_ids = {job.id: job.lead_id for job in jobs}
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception("Batch research error")
+            _fail_jobs(job_ids, f'Recherche fehlgeschlagen: {str(e)}')
+            return
+
+        # One transaction per lead, so a result that can't be saved only fails its own job
+        for job_id, lead_id in lead_ids.items():
+            research_result = results.get(job_id)
+            if lead_id not in leads:
+                _fail_jobs([job_id], 'Recherche fehlgeschlagen: Lead wurde gelöscht')
+                continue
+            if research_result is None:
+                _fail_jobs([job_id], 'Recherche fehlgeschlagen')
+                continue
+
+            try:
+                apply_research(db.session.get(Lead, lead_id), research_result)
+                db.session.get(ResearchJob, job_id).status = JobStatus.FINISHED.value
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.exception(f"Research error for job {job_id}")
+                _fail_jobs([job_id], f'Recherche fehlgeschlagen: {str(e)}')
@@ -1,7 +1,11 @@
 // FunnyFunnel - Lead Generator App (2025 Edition)
 
 const API_BASE = '/api';
+const JOB_POLL_INTERVAL = 1500;  // ms between research job status checks
+const JOB_POLL_TIMEOUT = 180000;  // give up polling after 3 minutes
 let leads = [];
+let leadsTotal = 0;
+let leadsCursor = null;
 let currentLeadId = null;
 let selectedLeads = new Set();
 
@@ -68,6 +72,20 @@ async function apiCall(endpoint, method = 'GET', data = null) {
     return response.json();
 }
 
+// Build the query string for the lead list (filters + cursor of the next page)
+function buildLeadsQuery(cursor) {
+    const statusFilter = document.getElementById('statusFilter').value;
+    const keywordFilter = document.getElementById('keywordFilter').value;
+
+    let queryParams = new URLSearchParams();
+    if (statusFilter) queryParams.append('status', statusFilter);
+    if (keywordFilter) queryParams.append('keyword', keywordFilter);
+    if (cursor) queryParams.append('cursor', cursor);
+
+    const queryString = queryParams.toString();
+    return `/leads${queryString ? '?' + queryString : ''}`;
+}
+
 // Load leads from API
 async function loadLeads() {
     const leadListEl = document.getElementById('leadList');
@@ -75,15 +93,10 @@ async function loadLeads() {
     try {
         leadListEl.innerHTML = '<div class="loading">Leads werden geladen...</div>';
 
-        const statusFilter = document.getElementById('statusFilter').value;
-        const keywordFilter = document.getElementById('keywordFilter').value;
-
-        let queryParams = new URLSearchParams();
-        if (statusFilter) queryParams.append('status', statusFilter);
-        if (keywordFilter) queryParams.append('keyword', keywordFilter);
-
-        const queryString = queryParams.toString();
-        leads = await apiCall(`/leads${queryString ? '?' + queryString : ''}`);
+        const response = await apiCall(buildLeadsQuery(null));
+        leads = response.items;
+        leadsTotal = response.total;
+        leadsCursor = response.next_cursor;
 
         renderLeads();
         updateStats();
@@ -99,6 +112,36 @@ async function loadLeads() {
     }
 }
 
+// Load the next page of leads and append it to the list
+async function loadMoreLeads(btn) {
+    btn.disabled = true;
+    btn.innerHTML = '<span>⏳</span> Lade...';
+
+    try {
+        const response = await apiCall(buildLeadsQuery(leadsCursor));
+        leads = leads.concat(response.items);
+        leadsTotal = response.total;
+        leadsCursor = response.next_cursor;
+        renderLeads();
+    } catch (error) {
+        showToast(error.message, 'error');
+        btn.disabled = false;
+        btn.innerHTML = 'Weitere Leads laden';
+    }
+}
+
+// Fetch the full lead (the list only contains summary fields)
+async function fetchLeadDetails(leadId) {
+    const fullLead = await apiCall(`/leads/${leadId}`);
+    fullLead.detailsLoaded = true;
+
+    const leadIndex = leads.findIndex(l => l.id === leadId);
+    if (leadIndex !== -1) {
+        leads[leadIndex] = fullLead;
+    }
+    return fullLead;
+}
+
 // Render leads to DOM
 function renderLeads() {
     const leadListEl = document.getElementById('leadList');
@@ -115,6 +158,16 @@ function renderLeads() {
     }
 
     leadListEl.innerHTML = leads.map((lead, index) => createLeadCard(lead, index)).join('');
+
+    if (leadsCursor && leads.length < leadsTotal) {
+        leadListEl.insertAdjacentHTML('beforeend', `
+            <div class="load-more">
+                <button class="btn btn-outline" onclick="loadMoreLeads(this)">
+                    Weitere Leads laden (${leads.length} von ${leadsTotal})
+                </button>
+            </div>
+        `);
+    }
     updateBulkActionsUI();
 }
 
@@ -145,7 +198,9 @@ function createLeadCard(lead, index) {
                 </div>
             </div>
             <div class="lead-details">
-                ${renderLeadDetails(lead, canResearch, canGenerateLetter)}
+                ${lead.detailsLoaded ?
+                    renderLeadDetails(lead, canResearch, canGenerateLetter) :
+                    '<div class="loading">Details werden geladen...</div>'}
             </div>
         </div>
     `;
@@ -278,6 +333,23 @@ function toggleLead(leadId) {
     });
 
     card.classList.toggle('expanded');
+
+    // Details are loaded on first expansion
+    const lead = leads.find(l => l.id === leadId);
+    if (!wasExpanded && lead && !lead.detailsLoaded) {
+        fetchLeadDetails(leadId).then(fullLead => {
+            const currentCard = document.getElementById(`lead-${leadId}`);
+            if (!currentCard) return;
+            const leadIndex = leads.findIndex(l => l.id === leadId);
+            const isExpanded = currentCard.classList.contains('expanded');
+            currentCard.outerHTML = createLeadCard(fullLead, leadIndex);
+            if (isExpanded) {
+                document.getElementById(`lead-${leadId}`).classList.add('expanded');
+            }
+        }).catch(error => {
+            showToast(error.message, 'error');
+        });
+    }
 }
 
 // Activate a lead (checkbox click)
@@ -291,6 +363,21 @@ async function activateLead(leadId) {
     }
 }
 
+// Poll a background research job until it is done; resolves with the updated lead
+async function waitForJob(jobId) {
+    const deadline = Date.now() + JOB_POLL_TIMEOUT;
+
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+
+        const job = await apiCall(`/jobs/${jobId}`);
+        if (job.status === 'finished') return job.lead;
+        if (job.status === 'failed') throw new Error(job.error || 'Recherche fehlgeschlagen');
+    }
+
+    throw new Error('Recherche dauert zu lange - bitte später neu laden');
+}
+
 // Research a lead
 async function researchLead(leadId, btn) {
     const originalContent = btn.innerHTML;
@@ -309,7 +396,9 @@ async function researchLead(leadId, btn) {
     }
 
     try {
-        const updatedLead = await apiCall(`/leads/${leadId}/research`, 'POST');
+        const job = await apiCall(`/leads/${leadId}/research`, 'POST');
+        const updatedLead = await waitForJob(job.job_id);
+        updatedLead.detailsLoaded = true;
 
         // Update the lead in the local array
         const leadIndex = leads.findIndex(l => l.id === leadId);
@@ -339,7 +428,16 @@ async function researchLead(leadId, btn) {
 // Open letter modal
 async function openLetterModal(leadId) {
     currentLeadId = leadId;
-    const lead = leads.find(l => l.id === leadId);
+    let lead = leads.find(l => l.id === leadId);
+
+    if (!lead.detailsLoaded) {
+        try {
+            lead = await fetchLeadDetails(leadId);
+        } catch (error) {
+            showToast(error.message, 'error');
+            return;
+        }
+    }
 
     if (!lead.anschreiben) {
         try {
@@ -790,6 +888,7 @@ window.toggleSelectAll = toggleSelectAll;
 window.clearSelection = clearSelection;
 window.deleteSelectedLeads = deleteSelectedLeads;
 window.toggleLead = toggleLead;
+window.loadMoreLeads = loadMoreLeads;
 window.activateLead = activateLead;
 window.researchLead = researchLead;
 window.openLetterModal = openLetterModal;